@@ -7,32 +7,69 @@ import socket
 import threading
 import json
 import struct
+import selectors
 import time
 from dataclasses import dataclass, field
-from typing import Dict, List, Set, Optional, Any, Type
+from typing import Dict, List, Set, Optional, Any, Type, Callable
 
 # ============================================================================
 # ECS CORE INFRASTRUCTURE
 # ============================================================================
 
 class Entity:
-    """An entity is just a unique ID with a set of components."""
+    """An entity is just a unique ID with a set of components.
+    
+    The components nearly every system reads (position, size, sprite) are
+    mirrored into attributes so hot loops skip the dict lookup; they are
+    None while the entity lacks that component.
+    """
+    __slots__ = ('id', 'components', 'archetype', 'active', 'world', 'position', 'size', 'sprite')
     _next_id = 0
     
     def __init__(self, world: 'World' = None):
         self.id = Entity._next_id
         Entity._next_id += 1
         self.components: Dict[Type, Any] = {}
+        self.archetype: frozenset = frozenset()  # Component types, keys World.archetypes
         self.active = True
         self.world = world
+        self.position: Optional['PositionComponent'] = None
+        self.size: Optional['SizeComponent'] = None
+        self.sprite: Optional['SpriteComponent'] = None
     
     def add_component(self, component) -> 'Entity':
         comp_type = type(component)
+        replaced = comp_type in self.components
         self.components[comp_type] = component
+        slot = COMPONENT_SLOTS.get(comp_type)
+        if slot:
+            setattr(self, slot, component)
         if self.world:
+            if replaced:
+                # Same archetype, but cached query rows hold the old component
+                self.world._row_cache.clear()
             self.world._register_component(comp_type, self)
         return self
     
+    def add_components(self, *components) -> 'Entity':
+        """Add several components at once, moving archetype a single time.
+        The factories use this since they know an entity's full makeup up front."""
+        own = self.components
+        replaced = False
+        for component in components:
+            comp_type = type(component)
+            if comp_type in own:
+                replaced = True
+            own[comp_type] = component
+            slot = COMPONENT_SLOTS.get(comp_type)
+            if slot:
+                setattr(self, slot, component)
+        if self.world:
+            if replaced:
+                self.world._row_cache.clear()
+            self.world._register_components([type(component) for component in components], self)
+        return self
+    
     def get_component(self, component_type: Type):
         return self.components.get(component_type)
     
@@ -40,104 +77,239 @@ class Entity:
         return component_type in self.components
     
     def has_components(self, *component_types) -> bool:
-        return all(ct in self.components for ct in component_types)
+        components = self.components
+        for ct in component_types:
+            if ct not in components:
+                return False
+        return True
     
     def remove_component(self, component_type: Type):
         if component_type in self.components:
             if self.world:
-                self.world._unregister_component(component_type, self.id)
+                self.world._move_archetype(self, self.archetype - {component_type})
             del self.components[component_type]
+            slot = COMPONENT_SLOTS.get(component_type)
+            if slot:
+                setattr(self, slot, None)
 
 class World:
     """The ECS World manages all entities and systems."""
     def __init__(self):
         self.entities: Dict[int, Entity] = {}
         self.systems: List['System'] = []
+        self._active_systems: List['System'] = []  # Rebuilt when systems are added or toggled
         self.entities_to_remove: Set[int] = set()
         self.batch = None
+        # Draw layers within batch; terrain is ordered under actors so lazily
+        # built shapes don't land on top of sprites created before them
+        self.terrain_group = None
+        self.actor_group = None
         self.camera = None
-        self.component_index: Dict[Type, Set[int]] = {}
+        # Entities bucketed by exact component set; queries walk matching buckets
+        self.archetypes: Dict[frozenset, Dict[int, Entity]] = {}
+        self._query_cache: Dict[frozenset, List[Dict[int, Entity]]] = {}
+        # Materialized get_entities_with results keyed by the argument tuple;
+        # dropped whenever an entity changes archetype or is removed
+        self._view_cache: Dict[tuple, List[Entity]] = {}
+        self._row_cache: Dict[tuple, List[tuple]] = {}  # Same, for query() rows
         self.spatial = None
         self.render_resources = None
+        self.pending_walls: Set[int] = set()  # Walls not yet solid (owner still inside)
+        self.pending_doors: Set[int] = set()  # Doors not yet blocking, same lifecycle
+        self.chopping_trees: Set[int] = set()  # Trees with chop progress, kept by HarvestSystem
+        self.obstacle_version = 0  # Bumped whenever an obstacle entity is added or removed
+        # Obstacles currently blocking movement: rocks, unchopped trees, solid
+        # walls, closed blocking doors. Kept current through mark_obstacle.
+        self.active_obstacles: Dict[int, Entity] = {}
+        self._obstacle_list: Optional[List[Entity]] = None  # active_obstacles as a list, until it changes
+        self._entity_pool: List[Entity] = []  # Released entity shells for create_entity to reuse
+        # First entity given a PlayerComponent (the local player); the
+        # single-player systems act on it
+        self.player_entity: Optional[Entity] = None
     
     def create_entity(self) -> Entity:
-        entity = Entity(self)
+        if self._entity_pool:
+            entity = self._entity_pool.pop()
+            entity.id = Entity._next_id
+            Entity._next_id += 1
+            entity.active = True
+        else:
+            entity = Entity(self)
         self.entities[entity.id] = entity
         return entity
     
     def remove_entity(self, entity_id: int):
         self.entities_to_remove.add(entity_id)
     
+    def mark_obstacle(self, entity: Entity, active: bool):
+        if active:
+            if entity.id not in self.active_obstacles:
+                self.active_obstacles[entity.id] = entity
+                self._obstacle_list = None
+                if self.spatial:
+                    self.spatial.add('obstacles', entity)
+        elif self.active_obstacles.pop(entity.id, None) is not None:
+            self._obstacle_list = None
+            if self.spatial:
+                self.spatial.remove('obstacles', entity.id)
+    
     def get_entity(self, entity_id: int) -> Optional[Entity]:
         return self.entities.get(entity_id)
     
     def get_entities_with(self, *component_types) -> List[Entity]:
+        """Entities having all component_types. The returned list is shared
+        between callers until the next structural change, so don't mutate it."""
         if not component_types:
             return [e for e in self.entities.values() if e.active]
         
-        index_sets = []
-        for comp_type in component_types:
-            entity_ids = self.component_index.get(comp_type)
-            if not entity_ids:
-                return []
-            index_sets.append(entity_ids)
-        
-        index_sets.sort(key=len)
-        common_ids = set(index_sets[0])
-        for ids in index_sets[1:]:
-            common_ids &= ids
-            if not common_ids:
-                return []
-        
-        return [self.entities[e_id] for e_id in common_ids if self.entities[e_id].active]
+        view = self._view_cache.get(component_types)
+        if view is not None:
+            return view
+        
+        key = frozenset(component_types)
+        buckets = self._query_cache.get(key)
+        if buckets is None:
+            buckets = [bucket for archetype, bucket in self.archetypes.items() if key <= archetype]
+            self._query_cache[key] = buckets
+        
+        view = self._view_cache[component_types] = [
+            entity for bucket in buckets for entity in bucket.values() if entity.active]
+        return view
+    
+    def query(self, *component_types) -> List[tuple]:
+        """Like get_entities_with, but returns (entity, *components) tuples.
+        Cached and shared the same way."""
+        rows = self._row_cache.get(component_types)
+        if rows is not None:
+            return rows
+        rows = self._row_cache[component_types] = []
+        for entity in self.get_entities_with(*component_types):
+            components = entity.components
+            rows.append((entity, *[components[ct] for ct in component_types]))
+        return rows
+    
+    def _invalidate_views(self):
+        self._view_cache.clear()
+        self._row_cache.clear()
     
     def add_system(self, system: 'System'):
         system.world = self
-        self.systems.append(system)
-        self.systems.sort(key=lambda s: s.priority)
+        # Insert after any systems of equal priority so registration order holds
+        index = len(self.systems)
+        while index > 0 and self.systems[index - 1].priority > system.priority:
+            index -= 1
+        self.systems.insert(index, system)
+        self._refresh_active_systems()
+    
+    def _refresh_active_systems(self):
+        self._active_systems = [system for system in self.systems if system.active]
     
     def update(self, dt: float):
         # Run all systems
-        for system in self.systems:
-            if system.active:
-                system.update(dt)
+        for system in self._active_systems:
+            system.update(dt)
         
-        # Clean up removed entities
+        if self.entities_to_remove:
+            self._flush_removals()
+    
+    def _flush_removals(self):
+        entities = self.entities
+        archetypes = self.archetypes
+        self._invalidate_views()
         for entity_id in self.entities_to_remove:
-            if entity_id in self.entities:
-                entity = self.entities[entity_id]
-                # Clean up sprite components
-                sprite_comp = entity.get_component(SpriteComponent)
-                if sprite_comp:
-                    sprite_comp.cleanup()
-                self._unregister_entity_components(entity)
-                del self.entities[entity_id]
+            entity = entities.pop(entity_id, None)
+            if entity is None:
+                continue
+            sprite_comp = entity.sprite
+            if sprite_comp:
+                sprite_comp.cleanup()
+            coll = entity.components.get(CollisionComponent)
+            if coll and coll.layer == "obstacle":
+                self.obstacle_version += 1
+                if self.active_obstacles.pop(entity_id, None) is not None:
+                    self._obstacle_list = None
+            if self.spatial:
+                # Grids hold entity references, which must not outlive the
+                # shell going back to the pool
+                self.spatial.discard(entity_id)
+            bucket = archetypes.get(entity.archetype)
+            if bucket is not None:
+                bucket.pop(entity_id, None)
+            if entity is self.player_entity:
+                self.player_entity = None
+            self._release_entity(entity)
         self.entities_to_remove.clear()
+        if self.player_entity is None:
+            self._reset_player()
+    
+    def _release_entity(self, entity: Entity):
+        # Callers must not hold entities past removal; a pooled shell comes
+        # back with a new id and components
+        if len(self._entity_pool) < ENTITY_POOL_SIZE:
+            entity.components.clear()
+            entity.position = entity.size = entity.sprite = None
+            entity.archetype = frozenset()
+            entity.active = False
+            self._entity_pool.append(entity)
     
     def clear(self):
-        for entity in list(self.entities.values()):
-            sprite_comp = entity.get_component(SpriteComponent)
+        # The indexes are dropped wholesale below, so only sprites need per-entity cleanup
+        for entity in self.entities.values():
+            sprite_comp = entity.sprite
             if sprite_comp:
                 sprite_comp.cleanup()
-            self._unregister_entity_components(entity)
         self.entities.clear()
-        self.component_index.clear()
+        self.archetypes.clear()
+        self._query_cache.clear()
+        self._invalidate_views()
+        self.pending_walls.clear()
+        self.pending_doors.clear()
+        self.chopping_trees.clear()
+        self.active_obstacles.clear()
+        self._obstacle_list = None
+        if self.spatial:
+            self.spatial.clear_all()
+        self._entity_pool.clear()
+        self.player_entity = None
+        self.obstacle_version += 1
         Entity._next_id = 0
     
     def _register_component(self, comp_type: Type, entity: Entity):
-        if comp_type not in self.component_index:
-            self.component_index[comp_type] = set()
-        self.component_index[comp_type].add(entity.id)
-    
-    def _unregister_component(self, comp_type: Type, entity_id: int):
-        if comp_type in self.component_index:
-            self.component_index[comp_type].discard(entity_id)
-            if not self.component_index[comp_type]:
-                del self.component_index[comp_type]
-    
-    def _unregister_entity_components(self, entity: Entity):
-        for comp_type in list(entity.components.keys()):
-            self._unregister_component(comp_type, entity.id)
+        if comp_type is CollisionComponent and entity.components[comp_type].layer == "obstacle":
+            self.obstacle_version += 1
+        elif comp_type is PlayerComponent and self.player_entity is None:
+            self.player_entity = entity
+        if comp_type not in entity.archetype:
+            self._move_archetype(entity, entity.archetype | {comp_type})
+    
+    def _register_components(self, comp_types: List[Type], entity: Entity):
+        for comp_type in comp_types:
+            if comp_type is CollisionComponent and entity.components[comp_type].layer == "obstacle":
+                self.obstacle_version += 1
+            elif comp_type is PlayerComponent and self.player_entity is None:
+                self.player_entity = entity
+        archetype = entity.archetype.union(comp_types)
+        if archetype != entity.archetype:
+            self._move_archetype(entity, archetype)
+    
+    def _move_archetype(self, entity: Entity, archetype: frozenset):
+        old_bucket = self.archetypes.get(entity.archetype)
+        if old_bucket is not None:
+            old_bucket.pop(entity.id, None)
+        bucket = self.archetypes.get(archetype)
+        if bucket is None:
+            # Buckets are never dropped, so cached queries only go stale here
+            bucket = self.archetypes[archetype] = {}
+            self._query_cache.clear()
+        bucket[entity.id] = entity
+        entity.archetype = archetype
+        self._invalidate_views()
+        if entity is self.player_entity and PlayerComponent not in archetype:
+            self._reset_player()
+    
+    def _reset_player(self):
+        players = self.get_entities_with(PlayerComponent)
+        self.player_entity = players[0] if players else None
 
 class System:
     """Base class for all systems."""
@@ -145,7 +317,17 @@ class System:
     
     def __init__(self):
         self.world: Optional[World] = None
-        self.active = True
+        self._active = True
+    
+    @property
+    def active(self) -> bool:
+        return self._active
+    
+    @active.setter
+    def active(self, value: bool):
+        self._active = value
+        if self.world:
+            self.world._refresh_active_systems()
     
     def update(self, dt: float):
         raise NotImplementedError
@@ -154,24 +336,39 @@ class System:
 # COMPONENTS (Pure Data)
 # ============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class PositionComponent:
     x: float = 0.0
     y: float = 0.0
-
-@dataclass
+    is_center: bool = False  # x, y is the center (trees, walls, doors, stairs) rather than bottom-left
+    # Hitbox rect cached by get_entity_rect, valid while x, y match the stamp
+    _rect: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _rect_x: float = field(default=0.0, init=False, repr=False, compare=False)
+    _rect_y: float = field(default=0.0, init=False, repr=False, compare=False)
+    # Full footprint cached by get_entity_footprint, same stamping scheme
+    _footprint: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _footprint_x: float = field(default=0.0, init=False, repr=False, compare=False)
+    _footprint_y: float = field(default=0.0, init=False, repr=False, compare=False)
+
+@dataclass(slots=True)
 class VelocityComponent:
     dx: float = 0.0
     dy: float = 0.0
     speed: float = 0.0
 
-@dataclass 
+@dataclass(slots=True)
 class SizeComponent:
     width: float = 30.0
     height: float = 30.0
     hitbox_margin: float = 0.0
+    hitbox_width: float = field(default=0.0, init=False)
+    hitbox_height: float = field(default=0.0, init=False)
+    
+    def __post_init__(self):
+        self.hitbox_width = self.width - self.hitbox_margin * 2
+        self.hitbox_height = self.height - self.hitbox_margin * 2
 
-@dataclass
+@dataclass(slots=True)
 class PlayerComponent:
     player_id: int = 1
     wood: int = 0
@@ -181,7 +378,7 @@ class PlayerComponent:
     velocity_x: float = 0.0
     velocity_y: float = 0.0
 
-@dataclass
+@dataclass(slots=True)
 class InputComponent:
     move_x: int = 0
     move_y: int = 0
@@ -191,41 +388,41 @@ class InputComponent:
     build_pressed: bool = False
     interact_pressed: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class EnemyComponent:
     enemy_id: int = 0
     stuck_timer: float = 0.0
     last_x: float = 0.0
     last_y: float = 0.0
 
-@dataclass
+@dataclass(slots=True)
 class ProjectileComponent:
     owner_id: int = 1
     network_sent: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class TreeComponent:
     tree_id: int = 0
     is_chopped: bool = False
     chop_progress: float = 0.0
     current_chopper: Optional[int] = None
 
-@dataclass
+@dataclass(slots=True)
 class RockComponent:
     rock_id: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class WallComponent:
     owner_id: Optional[int] = None
     is_solid: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class DoorComponent:
     owner_id: Optional[int] = None
     is_open: bool = False
     is_blocking: bool = False  # Like walls, starts non-blocking when built
 
-@dataclass
+@dataclass(slots=True)
 class StairsComponent:
     owner_id: Optional[int] = None
     direction_x: float = 0.0  # Direction towards higher level
@@ -233,16 +430,16 @@ class StairsComponent:
     from_level: int = 0  # Level stairs start from
     to_level: int = 1    # Level stairs go to
 
-@dataclass
+@dataclass(slots=True)
 class HeightComponent:
     level: int = 0  # Height level (0 = ground, 1+ = higher)
 
-@dataclass
+@dataclass(slots=True)
 class CollisionComponent:
     layer: str = "default"  # "player", "enemy", "projectile", "obstacle"
     collides_with: List[str] = field(default_factory=list)
 
-@dataclass
+@dataclass(slots=True)
 class HealthComponent:
     current: float = 100.0
     max_health: float = 100.0
@@ -250,45 +447,81 @@ class HealthComponent:
     regen_delay: float = 0.0
     last_damage_time: float = 0.0
 
+@dataclass(slots=True, eq=False)  # Compared by identity; it owns GPU resources
 class SpriteComponent:
     """Component for visual representation - holds pyglet shapes/sprites."""
-    def __init__(self):
-        self.shapes: List[Any] = []
-        self.sprite: Optional[pyglet.sprite.Sprite] = None
-        self.visible: bool = True
-        self.progress_bar_bg: Optional[Any] = None
-        self.progress_bar_fg: Optional[Any] = None
+    shapes: List[Any] = field(default_factory=list)
+    sprite: Optional[pyglet.sprite.Sprite] = None
+    visible: bool = True
+    on_screen: bool = True  # Cleared by RenderSystem while culled off-screen
+    progress_bar_bg: Optional[Any] = None
+    progress_bar_fg: Optional[Any] = None
+    door_panel: Optional[Any] = None  # Door panel shape, also in shapes
+    # Creates the drawables the first time the entity comes on screen; set
+    # by factories whose entities mostly sit outside the view
+    builder: Optional[Callable[['SpriteComponent'], None]] = None
     
     def add_shape(self, shape):
         self.shapes.append(shape)
     
+    def set_on_screen(self, on_screen: bool):
+        """Show or hide every drawable for culling. Progress bars are only
+        ever hidden here; the tree render pass shows them while chopping."""
+        if on_screen and self.builder is not None:
+            builder = self.builder
+            self.builder = None
+            builder(self)
+        self.on_screen = on_screen
+        for shape in self.shapes:
+            shape.visible = on_screen
+        if self.sprite is not None:
+            self.sprite.visible = on_screen
+        if not on_screen:
+            if self.progress_bar_bg is not None:
+                self.progress_bar_bg.visible = False
+            if self.progress_bar_fg is not None:
+                self.progress_bar_fg.visible = False
+    
     def cleanup(self):
+        # References are dropped after deleting, so a second cleanup
+        # (e.g. a chopped tree that is later removed) is a no-op
+        self.builder = None
         for shape in self.shapes:
-            try:
-                shape.delete()
-            except:
-                pass
+            shape.delete()
         self.shapes.clear()
-        if self.sprite:
-            try:
-                self.sprite.delete()
-            except:
-                pass
-        if self.progress_bar_bg:
-            try:
-                self.progress_bar_bg.delete()
-            except:
-                pass
-        if self.progress_bar_fg:
-            try:
-                self.progress_bar_fg.delete()
-            except:
-                pass
-
-@dataclass
+        self.door_panel = None
+        if self.sprite is not None:
+            self.sprite.delete()
+            self.sprite = None
+        if self.progress_bar_bg is not None:
+            self.progress_bar_bg.delete()
+            self.progress_bar_bg = None
+        if self.progress_bar_fg is not None:
+            self.progress_bar_fg.delete()
+            self.progress_bar_fg = None
+
+# TagComponent flags; test with mask & TAG_X
+TAG_PLAYER = 1
+TAG_ENEMY = 2
+TAG_PROJECTILE = 4
+TAG_TREE = 8
+TAG_ROCK = 16
+TAG_OBSTACLE = 32
+TAG_WALL = 64
+TAG_DOOR = 128
+TAG_STAIRS = 256
+
+@dataclass(slots=True)
 class TagComponent:
-    """Simple tag for entity identification."""
-    tags: Set[str] = field(default_factory=set)
+    """Simple tag for entity identification, as TAG_* bits."""
+    mask: int = 0
+
+# Components mirrored onto Entity attributes by add_component/remove_component
+COMPONENT_SLOTS = {
+    PositionComponent: 'position',
+    SizeComponent: 'size',
+    SpriteComponent: 'sprite',
+}
 
 # ============================================================================
 # CONSTANTS
@@ -326,6 +559,7 @@ MIN_ENEMY_SPAWN_RATE = 10
 MAX_ENEMIES = 150
 ENEMY_SPAWN_ACCELERATION = 0.5
 ENEMY_PATHFINDING_RANGE = 50
+ENEMY_ACTIVATION_RANGE = max(SCREEN_WIDTH, SCREEN_HEIGHT)  # Full AI inside this; plain chase beyond
 
 DAY_LENGTH = 60.0
 NIGHT_LENGTH = 45.0
@@ -342,11 +576,42 @@ TREE_SIZE = 25
 MAX_TREES = 80
 TREE_CHOP_TIME = 1.5
 HARVEST_RANGE = 60
+HARVEST_RANGE_SQ = HARVEST_RANGE * HARVEST_RANGE
 
 WALL_WOOD_COST = 1
 GRID_SIZE = PLAYER_SIZE
 WALL_SIZE = GRID_SIZE
 CORNER_SLIDE_THRESHOLD = 8
+SPATIAL_CELL_SIZE = 64  # About twice the size of players and enemies
+ENTITY_POOL_SIZE = 256
+CULL_MARGIN = ROCK_MAX_SIZE  # Largest drawn extent past an entity's anchor; beyond it drawables are hidden
+
+# Key bindings resolved once so key handlers don't walk pyglet.window.key per event
+ARROW_BITS = {
+    pyglet.window.key.UP: 1,
+    pyglet.window.key.DOWN: 2,
+    pyglet.window.key.LEFT: 4,
+    pyglet.window.key.RIGHT: 8,
+}
+# Shoot direction for every arrow mask; UP wins over DOWN and LEFT over RIGHT
+ARROW_DIRECTIONS = tuple(
+    (-1 if mask & 4 else 1 if mask & 8 else 0,
+     1 if mask & 1 else -1 if mask & 2 else 0)
+    for mask in range(16)
+)
+# Unit movement vector for every WASD input; diagonals are scaled so they
+# are no faster than straight moves
+MOVE_DIRECTIONS = {
+    (dx, dy): (dx / math.hypot(dx, dy), dy / math.hypot(dx, dy)) if dx or dy else (0, 0)
+    for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+}
+BUILD_KEY = pyglet.window.key.F
+CANCEL_KEY = pyglet.window.key.ESCAPE
+BUILDING_SELECT_KEYS = {
+    pyglet.window.key._1: 1, pyglet.window.key.NUM_1: 1,
+    pyglet.window.key._2: 2, pyglet.window.key.NUM_2: 2,
+    pyglet.window.key._3: 3, pyglet.window.key.NUM_3: 3,
+}
 
 # ============================================================================
 # CAMERA
@@ -381,6 +646,24 @@ class Camera:
     def screen_to_world(self, screen_x, screen_y):
         return (screen_x + self.x, screen_y + self.y)
 
+
+class TranslateGroup(pyglet.graphics.Group):
+    """Offsets the window view so child shapes can be built in local coordinates."""
+    
+    def __init__(self, window, order=0, parent=None):
+        super().__init__(order, parent)
+        self.window = window
+        self.x = 0
+        self.y = 0
+        self._saved_view = None
+    
+    def set_state(self):
+        self._saved_view = self.window.view
+        self.window.view = self._saved_view @ pyglet.math.Mat4.from_translation(pyglet.math.Vec3(self.x, self.y, 0))
+    
+    def unset_state(self):
+        self.window.view = self._saved_view
+
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
@@ -391,255 +674,447 @@ def check_collision(rect1, rect2):
     return (x1 < x2 + w2 and x1 + w1 > x2 and
             y1 < y2 + h2 and y1 + h1 > y2)
 
+def resolve_move(old_x, old_y, new_x, new_y, margin, hitbox_size, obstacle_rects,
+                 input_x, input_y, slide_step):
+    """Resolve a square hitbox moving from old to new against obstacle rects.
+    
+    Blocked axes are dropped, the mover slides around corners it only clips
+    by CORNER_SLIDE_THRESHOLD, and a move that still ends overlapping
+    anything is reverted. Returns (final_x, final_y, moved_x, moved_y) where
+    moved_x/y is the unblocked displacement used for velocity.
+    """
+    can_move_x = True
+    can_move_y = True
+    blocking_index = -1
+    
+    old_left = old_x + margin
+    old_bottom = old_y + margin
+    new_left = new_x + margin
+    new_bottom = new_y + margin
+    old_right = old_left + hitbox_size
+    old_top = old_bottom + hitbox_size
+    new_right = new_left + hitbox_size
+    new_top = new_bottom + hitbox_size
+    
+    for index, (ox, oy, ow, oh) in enumerate(obstacle_rects):
+        ox1 = ox + ow
+        oy1 = oy + oh
+        # Check collision with new position
+        if new_left < ox1 and new_right > ox and new_bottom < oy1 and new_top > oy:
+            blocking_index = index
+            # Test X-only and Y-only movement separately
+            if new_left < ox1 and new_right > ox and old_bottom < oy1 and old_top > oy:
+                can_move_x = False
+            if old_left < ox1 and old_right > ox and new_bottom < oy1 and new_top > oy:
+                can_move_y = False
+            # If both directions blocked, don't check other obstacles
+            if not can_move_x and not can_move_y:
+                break
+    
+    if blocking_index < 0:
+        # Nothing overlapped the new position, so the double-check below
+        # would only repeat the loop above
+        return new_x, new_y, new_x - old_x, new_y - old_y
+    
+    # Only slide if very close to an edge of the blocking obstacle (reduces edge catching)
+    if not can_move_x or not can_move_y:
+        ox, oy, ow, oh = obstacle_rects[blocking_index]
+        
+        if input_x != 0 and not can_move_x and can_move_y:
+            # Distance from the hitbox center to the top and bottom edges
+            center_y = old_bottom + hitbox_size / 2
+            if abs(center_y - (oy + oh)) < CORNER_SLIDE_THRESHOLD:
+                slide_y = slide_step
+            elif abs(center_y - oy) < CORNER_SLIDE_THRESHOLD:
+                slide_y = -slide_step
+            else:
+                slide_y = 0
+            if slide_y:
+                # Re-check collision after slide
+                bottom = old_bottom + slide_y
+                top = bottom + hitbox_size
+                for index, (rx, ry, rw, rh) in enumerate(obstacle_rects):
+                    if (index != blocking_index and new_left < rx + rw and new_right > rx and
+                            bottom < ry + rh and top > ry):
+                        break
+                else:
+                    new_y += slide_y
+        
+        if input_y != 0 and not can_move_y and can_move_x:
+            # Distance from the hitbox center to the left and right edges
+            center_x = old_left + hitbox_size / 2
+            if abs(center_x - (ox + ow)) < CORNER_SLIDE_THRESHOLD:
+                slide_x = slide_step
+            elif abs(center_x - ox) < CORNER_SLIDE_THRESHOLD:
+                slide_x = -slide_step
+            else:
+                slide_x = 0
+            if slide_x:
+                left = old_left + slide_x
+                right = left + hitbox_size
+                for index, (rx, ry, rw, rh) in enumerate(obstacle_rects):
+                    if (index != blocking_index and left < rx + rw and right > rx and
+                            new_bottom < ry + rh and new_top > ry):
+                        break
+                else:
+                    new_x += slide_x
+    
+    moved_x = new_x - old_x if can_move_x else 0
+    moved_y = new_y - old_y if can_move_y else 0
+    final_x = new_x if can_move_x else old_x
+    final_y = new_y if can_move_y else old_y
+    
+    # Double-check no collision at final position (prevents clipping)
+    left = final_x + margin
+    bottom = final_y + margin
+    right = left + hitbox_size
+    top = bottom + hitbox_size
+    for ox, oy, ow, oh in obstacle_rects:
+        if left < ox + ow and right > ox and bottom < oy + oh and top > oy:
+            return old_x, old_y, moved_x, moved_y
+    
+    return final_x, final_y, moved_x, moved_y
+
+def collect_collisions(rect, entity_ids, rects, results):
+    """Add the ids whose rects (looked up in rects) overlap rect to results."""
+    x1, y1, w1, h1 = rect
+    right = x1 + w1
+    top = y1 + h1
+    for entity_id in entity_ids:
+        if entity_id in results:
+            continue
+        x2, y2, w2, h2 = rects[entity_id]
+        if x1 < x2 + w2 and right > x2 and y1 < y2 + h2 and top > y2:
+            results.add(entity_id)
+
+# Snapped cell centre for every whole-pixel coordinate inside the world
+_SNAP_TABLE = tuple((i // GRID_SIZE) * GRID_SIZE + GRID_SIZE // 2 for i in range(max(WORLD_WIDTH, WORLD_HEIGHT) + 1))
+
 def snap_to_grid(x, y):
+    if 0 <= x < len(_SNAP_TABLE) and 0 <= y < len(_SNAP_TABLE):
+        return _SNAP_TABLE[int(x)], _SNAP_TABLE[int(y)]
     grid_x = (x // GRID_SIZE) * GRID_SIZE + GRID_SIZE // 2
     grid_y = (y // GRID_SIZE) * GRID_SIZE + GRID_SIZE // 2
     return grid_x, grid_y
 
 def get_entity_rect(entity: Entity):
     """Get collision rectangle for an entity. Returns (x, y, width, height) where x,y is top-left."""
-    pos = entity.get_component(PositionComponent)
-    size = entity.get_component(SizeComponent)
-    if pos and size:
-        margin = size.hitbox_margin
-        # Check if entity uses center position (trees, walls)
-        tree = entity.get_component(TreeComponent)
-        wall = entity.get_component(WallComponent)
-        if tree or wall:
-            # Position is center, convert to top-left
-            top_left_x = pos.x - size.width / 2
-            top_left_y = pos.y - size.height / 2
-            # Apply margin after conversion
-            return (top_left_x + margin, top_left_y + margin, 
-                    size.width - margin * 2, size.height - margin * 2)
-        else:
-            # Position is top-left
-            return (pos.x + margin, pos.y + margin, 
-                    size.width - margin * 2, size.height - margin * 2)
-    return None
+    pos = entity.position
+    size = entity.size
+    if pos is None or size is None:
+        return None
+    x = pos.x
+    y = pos.y
+    rect = pos._rect
+    if rect is not None and pos._rect_x == x and pos._rect_y == y:
+        return rect
+    margin = size.hitbox_margin
+    left = x
+    bottom = y
+    if pos.is_center:
+        # Position is center, convert to top-left
+        left -= size.width / 2
+        bottom -= size.height / 2
+    rect = pos._rect = (left + margin, bottom + margin, size.hitbox_width, size.hitbox_height)
+    pos._rect_x = x
+    pos._rect_y = y
+    return rect
+
+def get_entity_footprint(entity: Entity):
+    """Get the full grid footprint (x, y, width, height) of a centered structure.
+
+    Walls, doors and stairs never move, so the rect is computed once and
+    reused until the position changes.
+    """
+    pos = entity.position
+    x = pos.x
+    y = pos.y
+    rect = pos._footprint
+    if rect is not None and pos._footprint_x == x and pos._footprint_y == y:
+        return rect
+    size = entity.size
+    rect = pos._footprint = (x - size.width // 2, y - size.height // 2, size.width, size.height)
+    pos._footprint_x = x
+    pos._footprint_y = y
+    return rect
 
 def get_entity_center(entity: Entity):
     """Get center position of an entity."""
-    pos = entity.get_component(PositionComponent)
-    size = entity.get_component(SizeComponent)
-    if pos and size:
-        # Check if entity uses center position (trees, walls)
-        tree = entity.get_component(TreeComponent)
-        wall = entity.get_component(WallComponent)
-        if tree or wall:
-            # Position is already center
-            return (pos.x, pos.y)
-        else:
-            # Position is top-left, calculate center
-            return (pos.x + size.width / 2, pos.y + size.height / 2)
-    elif pos:
+    pos = entity.position
+    if pos is None:
+        return (0, 0)
+    size = entity.size
+    if size is None or pos.is_center:
         return (pos.x, pos.y)
-    return (0, 0)
+    # Position is top-left, calculate center
+    return (pos.x + size.width / 2, pos.y + size.height / 2)
 
 def gather_world_obstacles(world: World) -> List[Entity]:
-    """Fallback for when spatial partitioning isn't available."""
-    obstacles = []
-    for entity in world.get_entities_with(PositionComponent, SizeComponent, CollisionComponent):
-        coll = entity.get_component(CollisionComponent)
-        if coll.layer != "obstacle":
-            continue
-        tree = entity.get_component(TreeComponent)
-        if tree and tree.is_chopped:
-            continue
-        wall = entity.get_component(WallComponent)
-        if wall and not wall.is_solid:
-            continue
-        door = entity.get_component(DoorComponent)
-        if door:
-            # Doors only block if they're closed AND blocking (player has moved away)
-            if door.is_open or not door.is_blocking:
-                continue
-        obstacles.append(entity)
+    """Fallback for when spatial partitioning isn't available.
+    Shared between callers until the obstacle set changes; don't mutate it."""
+    obstacles = world._obstacle_list
+    if obstacles is None:
+        obstacles = world._obstacle_list = list(world.active_obstacles.values())
     return obstacles
 
 # ============================================================================
-# SPATIAL PARTITIONING (QUADTREE)
+# SPATIAL PARTITIONING (SPATIAL HASH)
 # ============================================================================
 
-class QuadTree:
-    """Simple quadtree for spatial partitioning."""
-    def __init__(self, bounds, level=0, max_objects=8, max_levels=6):
-        self.bounds = bounds  # (x, y, width, height)
-        self.level = level
-        self.max_objects = max_objects
-        self.max_levels = max_levels
-        self.objects: List[tuple] = []  # (rect, entity_id)
-        self.nodes: List['QuadTree'] = []
+class SpatialHash:
+    """Uniform grid over the bounded world, bucketing entities by the cells their rects overlap.
+    
+    Cells live in a flat list indexed by cx * rows + cy. Rects past the world
+    edge (off-screen spawns, projectiles leaving the map) clamp to the border
+    cells, so the exact rect check in retrieve still decides every hit.
+    """
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE, width=WORLD_WIDTH, height=WORLD_HEIGHT):
+        self.cell_size = cell_size
+        self.cols = int(width // cell_size) + 1
+        self.rows = int(height // cell_size) + 1
+        self.cells: List[List[int]] = [[] for _ in range(self.cols * self.rows)]  # entity ids per cell
+        self.rects: Dict[int, tuple] = {}  # entity id -> rect, stored once per entity
+        self.entities: Dict[int, Entity] = {}  # entity id -> entity, so queries skip World.get_entity
     
     def clear(self):
-        self.objects.clear()
-        for node in self.nodes:
-            node.clear()
-        self.nodes = []
-    
-    def split(self):
-        x, y, w, h = self.bounds
-        half_w = w / 2
-        half_h = h / 2
-        next_level = self.level + 1
-        self.nodes = [
-            QuadTree((x, y, half_w, half_h), next_level, self.max_objects, self.max_levels),  # Top-left
-            QuadTree((x + half_w, y, half_w, half_h), next_level, self.max_objects, self.max_levels),  # Top-right
-            QuadTree((x, y + half_h, half_w, half_h), next_level, self.max_objects, self.max_levels),  # Bottom-left
-            QuadTree((x + half_w, y + half_h, half_w, half_h), next_level, self.max_objects, self.max_levels),  # Bottom-right
-        ]
-    
-    def _rect_fits(self, rect, bounds):
-        rx, ry, rw, rh = rect
-        bx, by, bw, bh = bounds
-        return (rx >= bx and ry >= by and
-                rx + rw <= bx + bw and
-                ry + rh <= by + bh)
-    
-    def insert(self, rect, entity_id):
-        if self.nodes:
-            for idx, node in enumerate(self.nodes):
-                if self._rect_fits(rect, node.bounds):
-                    node.insert(rect, entity_id)
-                    return
-        
-        self.objects.append((rect, entity_id))
-        
-        if (len(self.objects) > self.max_objects) and (self.level < self.max_levels):
-            if not self.nodes:
-                self.split()
-            i = 0
-            while i < len(self.objects):
-                moved = False
-                for node in self.nodes:
-                    if self._rect_fits(self.objects[i][0], node.bounds):
-                        rect_to_move, ent_id = self.objects.pop(i)
-                        node.insert(rect_to_move, ent_id)
-                        moved = True
-                        break
-                if not moved:
-                    i += 1
+        for bucket in self.cells:
+            bucket.clear()
+        self.rects.clear()
+        self.entities.clear()
+    
+    def cell_span(self, rect):
+        """Clamped (cx0, cx1, cy0, cy1) cell range covered by rect."""
+        x, y, w, h = rect
+        size = self.cell_size
+        max_cx = self.cols - 1
+        max_cy = self.rows - 1
+        cx0 = int(x // size)
+        cx1 = int((x + w) // size)
+        cy0 = int(y // size)
+        cy1 = int((y + h) // size)
+        return (0 if cx0 < 0 else max_cx if cx0 > max_cx else cx0,
+                0 if cx1 < 0 else max_cx if cx1 > max_cx else cx1,
+                0 if cy0 < 0 else max_cy if cy0 > max_cy else cy0,
+                0 if cy1 < 0 else max_cy if cy1 > max_cy else cy1)
+    
+    def insert(self, rect, entity: Entity):
+        cx0, cx1, cy0, cy1 = self.cell_span(rect)
+        cells = self.cells
+        rows = self.rows
+        entity_id = entity.id
+        self.rects[entity_id] = rect
+        self.entities[entity_id] = entity
+        for cx in range(cx0, cx1 + 1):
+            base = cx * rows
+            for index in range(base + cy0, base + cy1 + 1):
+                cells[index].append(entity_id)
     
     def retrieve(self, rect, results=None):
         if results is None:
             results = set()
         
-        # Check objects in this node
-        for obj_rect, entity_id in self.objects:
-            if check_collision(rect, obj_rect):
-                results.add(entity_id)
-        
-        # Check child nodes if they exist and bounds intersect
-        for node in self.nodes:
-            if check_collision(rect, node.bounds):
-                node.retrieve(rect, results)
+        cx0, cx1, cy0, cy1 = self.cell_span(rect)
+        cells = self.cells
+        rows = self.rows
+        rects = self.rects
+        for cx in range(cx0, cx1 + 1):
+            base = cx * rows
+            for index in range(base + cy0, base + cy1 + 1):
+                bucket = cells[index]
+                if bucket:
+                    collect_collisions(rect, bucket, rects, results)
         
         return results
+    
+    def move(self, entity: Entity, rect):
+        """Insert or update an entity, re-bucketing only if its cell range changed."""
+        span = self.cell_span(rect)
+        cells = self.cells
+        rows = self.rows
+        entity_id = entity.id
+        old_rect = self.rects.get(entity_id)
+        self.rects[entity_id] = rect
+        self.entities[entity_id] = entity
+        if old_rect is not None:
+            old_span = self.cell_span(old_rect)
+            if old_span == span:
+                return
+            ox0, ox1, oy0, oy1 = old_span
+            for cx in range(ox0, ox1 + 1):
+                base = cx * rows
+                for index in range(base + oy0, base + oy1 + 1):
+                    cells[index].remove(entity_id)
+        cx0, cx1, cy0, cy1 = span
+        for cx in range(cx0, cx1 + 1):
+            base = cx * rows
+            for index in range(base + cy0, base + cy1 + 1):
+                cells[index].append(entity_id)
+    
+    def remove(self, entity_id):
+        rect = self.rects.pop(entity_id, None)
+        if rect is None:
+            return
+        del self.entities[entity_id]
+        cx0, cx1, cy0, cy1 = self.cell_span(rect)
+        cells = self.cells
+        rows = self.rows
+        for cx in range(cx0, cx1 + 1):
+            base = cx * rows
+            for index in range(base + cy0, base + cy1 + 1):
+                cells[index].remove(entity_id)
 
 
 class SpatialPartition:
-    """Manages quadtrees for different entity categories."""
-    def __init__(self, width, height):
-        bounds = (0, 0, width, height)
-        self.trees = {
-            'obstacles': QuadTree(bounds),
-            'enemies': QuadTree(bounds),
-            'projectiles': QuadTree(bounds),
-            'players': QuadTree(bounds),
+    """Manages spatial hashes for different entity categories."""
+    def __init__(self, cell_size=SPATIAL_CELL_SIZE):
+        self.grids = {
+            'obstacles': SpatialHash(cell_size),
+            'enemies': SpatialHash(cell_size),
         }
+        # Obstacles are static, so their grid is only rebuilt in full when
+        # flagged; individual changes go through add/remove
+        self.obstacles_dirty = True
     
     def clear_all(self):
-        for tree in self.trees.values():
-            tree.clear()
+        for grid in self.grids.values():
+            grid.clear()
+        self.obstacles_dirty = True
+    
+    def add(self, category, entity: Entity):
+        grid = self.grids.get(category)
+        rect = get_entity_rect(entity)
+        if grid and rect:
+            grid.remove(entity.id)
+            grid.insert(rect, entity)
+    
+    def remove(self, category, entity_id: int):
+        grid = self.grids.get(category)
+        if grid:
+            grid.remove(entity_id)
+    
+    def discard(self, entity_id: int):
+        """Drop an entity from every category, e.g. once it is removed from the world."""
+        for grid in self.grids.values():
+            grid.remove(entity_id)
     
     def update_category(self, category, entities: List[Entity]):
-        tree = self.trees.get(category)
-        if not tree:
+        """Rebuild a category's grid from scratch."""
+        grid = self.grids.get(category)
+        if not grid:
             return
-        tree.clear()
-        for entity in entities:
-            rect = get_entity_rect(entity)
-            if rect:
-                tree.insert(rect, entity.id)
+        grid.clear()
+        self.sync_category(category, entities)
     
-    def query(self, category, rect):
-        tree = self.trees.get(category)
-        if not tree:
-            return set()
-        return tree.retrieve(rect, set())
+    def sync_category(self, category, entities: List[Entity]):
+        """Bring a category's grid in line with entities, moving only what changed cells."""
+        grid = self.grids.get(category)
+        if not grid:
+            return
+        # Same rect math as get_entity_rect, inlined since this runs for
+        # every entity in the category each frame
+        move = grid.move
+        seen = set()
+        for entity in entities:
+            pos = entity.position
+            size = entity.size
+            if pos is None or size is None:
+                continue
+            margin = size.hitbox_margin
+            x = pos.x
+            y = pos.y
+            if pos.is_center:
+                x -= size.width / 2
+                y -= size.height / 2
+            move(entity, (x + margin, y + margin, size.hitbox_width, size.hitbox_height))
+            seen.add(entity.id)
+        
+        if len(seen) != len(grid.rects):
+            for entity_id in [i for i in grid.rects if i not in seen]:
+                grid.remove(entity_id)
+    
+    def query(self, category, rect) -> List[Entity]:
+        """Entities in category whose rects overlap rect."""
+        grid = self.grids.get(category)
+        if not grid:
+            return []
+        entities = grid.entities
+        return [entities[entity_id] for entity_id in grid.retrieve(rect, set())]
 
 # ============================================================================
 # RENDER RESOURCE MANAGER
 # ============================================================================
 
+def bordered_square_bytes(size, fill_color, border_color, border_thickness):
+    """RGBA pixel data for a filled square with a solid border."""
+    border_pixel = bytes((border_color[0], border_color[1], border_color[2], 255))
+    fill_pixel = bytes((fill_color[0], fill_color[1], fill_color[2], 255))
+    border_row = border_pixel * size
+    inner_width = max(0, size - 2 * border_thickness)
+    inner_row = (border_pixel * border_thickness + fill_pixel * inner_width +
+                 border_pixel * border_thickness)[:size * 4]
+    rows = [border_row if y < border_thickness or y >= size - border_thickness else inner_row
+            for y in range(size)]
+    return b''.join(rows)
+
+def radial_gradient_bytes(size, inner_color, outer_color):
+    """RGBA pixel data for a square fading from inner_color to outer_color."""
+    center = (size - 1) / 2
+    max_dist = math.sqrt(2 * (center ** 2))
+    half = (size + 1) // 2
+    # The gradient is symmetric about both axes: build the top-left
+    # quadrant and mirror it
+    rows = []
+    for y in range(half):
+        dy = y - center
+        pixels = []
+        for x in range(half):
+            dx = x - center
+            t = min(math.sqrt(dx * dx + dy * dy) / max_dist, 1.0)
+            pixels.append(bytes((
+                int(inner_color[0] * (1 - t) + outer_color[0] * t),
+                int(inner_color[1] * (1 - t) + outer_color[1] * t),
+                int(inner_color[2] * (1 - t) + outer_color[2] * t),
+                int(inner_color[3] * (1 - t) + outer_color[3] * t),
+            )))
+        rows.append(b''.join(pixels + pixels[size // 2 - 1::-1]))
+    rows.extend(rows[size // 2 - 1::-1])
+    return b''.join(rows)
+
+# Texture inputs are all constants, so the pixel data is built once at import
+# rather than on the first gameplay frame that needs it
+ENEMY_TEXTURE = bordered_square_bytes(ENEMY_SIZE, fill_color=RED, border_color=WHITE, border_thickness=2)
+PROJECTILE_TEXTURE = radial_gradient_bytes(PROJECTILE_SIZE, inner_color=(255, 255, 200, 255), outer_color=(255, 180, 30, 30))
+WALL_TEXTURE = bordered_square_bytes(WALL_SIZE, fill_color=(139, 90, 43), border_color=(101, 67, 33), border_thickness=2)
+
+
 class RenderResourceManager:
     """Caches procedural textures so sprites can share image data."""
     def __init__(self):
         self.cache: Dict[Any, pyglet.image.ImageData] = {}
     
+    def _get_image(self, key, size, data):
+        """data is the RGBA bytes, or a callable returning them for textures
+        that are only worth building on a cache miss."""
+        image = self.cache.get(key)
+        if image is None:
+            if callable(data):
+                data = data()
+            image = self.cache[key] = pyglet.image.ImageData(size, size, 'RGBA', data)
+        return image
+    
     def get_enemy_image(self):
-        key = ('enemy', ENEMY_SIZE)
-        if key not in self.cache:
-            self.cache[key] = self._create_bordered_square_image(
-                ENEMY_SIZE,
-                fill_color=RED,
-                border_color=WHITE,
-                border_thickness=2
-            )
-        return self.cache[key]
+        return self._get_image('enemy', ENEMY_SIZE, ENEMY_TEXTURE)
     
     def get_projectile_image(self):
-        key = ('projectile', PROJECTILE_SIZE)
-        if key not in self.cache:
-            self.cache[key] = self._create_radial_gradient_image(
-                PROJECTILE_SIZE,
-                inner_color=(255, 255, 200, 255),
-                outer_color=(255, 180, 30, 30)
-            )
-        return self.cache[key]
+        return self._get_image('projectile', PROJECTILE_SIZE, PROJECTILE_TEXTURE)
     
     def get_wall_image(self):
-        key = ('wall', WALL_SIZE)
-        if key not in self.cache:
-            self.cache[key] = self._create_bordered_square_image(
-                WALL_SIZE,
-                fill_color=(139, 90, 43),
-                border_color=(101, 67, 33),
-                border_thickness=2
-            )
-        return self.cache[key]
-    
-    def _create_bordered_square_image(self, size, fill_color, border_color, border_thickness):
-        data = bytearray(size * size * 4)
-        for y in range(size):
-            for x in range(size):
-                if (x < border_thickness or y < border_thickness or
-                        x >= size - border_thickness or y >= size - border_thickness):
-                    color = border_color
-                else:
-                    color = fill_color
-                idx = (y * size + x) * 4
-                data[idx] = color[0]
-                data[idx + 1] = color[1]
-                data[idx + 2] = color[2]
-                data[idx + 3] = 255
-        return pyglet.image.ImageData(size, size, 'RGBA', bytes(data))
-    
-    def _create_radial_gradient_image(self, size, inner_color, outer_color):
-        data = bytearray(size * size * 4)
-        center = (size - 1) / 2
-        max_dist = math.sqrt(2 * (center ** 2))
-        for y in range(size):
-            for x in range(size):
-                dx = x - center
-                dy = y - center
-                t = min(math.sqrt(dx * dx + dy * dy) / max_dist, 1.0)
-                idx = (y * size + x) * 4
-                data[idx] = int(inner_color[0] * (1 - t) + outer_color[0] * t)
-                data[idx + 1] = int(inner_color[1] * (1 - t) + outer_color[1] * t)
-                data[idx + 2] = int(inner_color[2] * (1 - t) + outer_color[2] * t)
-                data[idx + 3] = int(inner_color[3] * (1 - t) + outer_color[3] * t)
-        return pyglet.image.ImageData(size, size, 'RGBA', bytes(data))
+        return self._get_image('wall', WALL_SIZE, WALL_TEXTURE)
+    
+    def get_player_image(self, color):
+        color = tuple(color)
+        return self._get_image(('player', color), PLAYER_SIZE,
+                               lambda: bytes(color + (255,)) * (PLAYER_SIZE * PLAYER_SIZE))
 
 # ============================================================================
 # SCREEN MANAGER
@@ -669,48 +1144,33 @@ class InputSystem(System):
     """Handles player input and updates InputComponent."""
     priority = 0
     
-    def __init__(self, keys, arrow_keys_pressed):
+    def __init__(self, keys, game_window):
         super().__init__()
         self.keys = keys
-        self.arrow_keys_pressed = arrow_keys_pressed
+        self.game_window = game_window
+        # Key codes resolved once rather than through pyglet.window.key every frame
+        key = pyglet.window.key
+        self._k_w, self._k_s, self._k_a, self._k_d = key.W, key.S, key.A, key.D
+        self._k_space = key.SPACE
     
     def update(self, dt: float):
-        for entity in self.world.get_entities_with(PlayerComponent, InputComponent):
-            input_comp = entity.get_component(InputComponent)
-            
-            # Movement input (WASD)
-            input_comp.move_x = 0
-            input_comp.move_y = 0
-            if self.keys[pyglet.window.key.W]:
-                input_comp.move_y += 1
-            if self.keys[pyglet.window.key.S]:
-                input_comp.move_y -= 1
-            if self.keys[pyglet.window.key.A]:
-                input_comp.move_x -= 1
-            if self.keys[pyglet.window.key.D]:
-                input_comp.move_x += 1
+        keys = self.keys
+        for _, _, input_comp in self.world.query(PlayerComponent, InputComponent):
+            # Movement input (WASD): opposing keys cancel out
+            input_comp.move_x = int(keys[self._k_d]) - int(keys[self._k_a])
+            input_comp.move_y = int(keys[self._k_w]) - int(keys[self._k_s])
             
             # Shooting input (Arrow keys)
-            input_comp.shoot_x = 0
-            input_comp.shoot_y = 0
-            if self.arrow_keys_pressed.get(pyglet.window.key.UP, False):
-                input_comp.shoot_y = 1
-            elif self.arrow_keys_pressed.get(pyglet.window.key.DOWN, False):
-                input_comp.shoot_y = -1
-            if self.arrow_keys_pressed.get(pyglet.window.key.LEFT, False):
-                input_comp.shoot_x = -1
-            elif self.arrow_keys_pressed.get(pyglet.window.key.RIGHT, False):
-                input_comp.shoot_x = 1
-            
-            # Harvest input
-            input_comp.harvest_pressed = self.keys[pyglet.window.key.SPACE]
+            input_comp.shoot_x, input_comp.shoot_y = ARROW_DIRECTIONS[self.game_window.arrow_mask]
             
-            # Interact input (spacebar also used for interaction)
-            input_comp.interact_pressed = self.keys[pyglet.window.key.SPACE]
+            # Harvest and interact share the spacebar
+            space_pressed = keys[self._k_space]
+            input_comp.harvest_pressed = space_pressed
+            input_comp.interact_pressed = space_pressed
 
 
 class SpatialPartitionSystem(System):
-    """Populates quadtrees for fast spatial queries."""
+    """Populates spatial hashes for fast spatial queries."""
     priority = 5
     
     def update(self, dt: float):
@@ -718,32 +1178,16 @@ class SpatialPartitionSystem(System):
             return
         
         spatial = self.world.spatial
-        spatial.clear_all()
         
-        # Obstacles (rocks, unchopped trees, solid walls, closed doors)
-        obstacles = []
-        for entity in self.world.get_entities_with(PositionComponent, SizeComponent, CollisionComponent):
-            coll = entity.get_component(CollisionComponent)
-            if coll.layer != "obstacle":
-                continue
-            tree = entity.get_component(TreeComponent)
-            if tree and tree.is_chopped:
-                continue
-            wall = entity.get_component(WallComponent)
-            if wall and not wall.is_solid:
-                continue
-            door = entity.get_component(DoorComponent)
-            if door:
-                # Doors only block if they're closed AND blocking (player has moved away)
-                if door.is_open or not door.is_blocking:
-                    continue
-            obstacles.append(entity)
-        spatial.update_category('obstacles', obstacles)
+        # Obstacles (rocks, unchopped trees, solid walls, closed doors) are
+        # kept current by World.mark_obstacle; rebuild only after a reset
+        if spatial.obstacles_dirty:
+            spatial.update_category('obstacles', self.world.active_obstacles.values())
+            spatial.obstacles_dirty = False
         
-        # Dynamic categories
-        spatial.update_category('enemies', self.world.get_entities_with(EnemyComponent, PositionComponent, SizeComponent))
-        spatial.update_category('projectiles', self.world.get_entities_with(ProjectileComponent, PositionComponent, SizeComponent))
-        spatial.update_category('players', self.world.get_entities_with(PlayerComponent, PositionComponent, SizeComponent))
+        # Enemies only re-bucket those that crossed a cell boundary. Projectiles
+        # and players are never looked up spatially, so they aren't indexed
+        spatial.sync_category('enemies', self.world.get_entities_with(EnemyComponent, PositionComponent, SizeComponent))
 
 
 class MovementSystem(System):
@@ -751,25 +1195,18 @@ class MovementSystem(System):
     priority = 10
     
     def update(self, dt: float):
-        for entity in self.world.get_entities_with(PlayerComponent, PositionComponent, InputComponent, VelocityComponent, SizeComponent):
-            self._move_player(entity, dt)
+        for entity, player, _, input_comp, vel, _ in self.world.query(PlayerComponent, PositionComponent, InputComponent, VelocityComponent, SizeComponent):
+            self._move_player(entity, player, input_comp, vel, dt)
     
-    def _move_player(self, entity: Entity, dt: float):
-        pos = entity.get_component(PositionComponent)
-        input_comp = entity.get_component(InputComponent)
-        vel = entity.get_component(VelocityComponent)
-        size = entity.get_component(SizeComponent)
-        player = entity.get_component(PlayerComponent)
+    def _move_player(self, entity: Entity, player: PlayerComponent, input_comp: InputComponent,
+                     vel: VelocityComponent, dt: float):
+        pos = entity.position
+        size = entity.size
         
         old_x, old_y = pos.x, pos.y
         
         # Normalize movement vector so diagonal movement is same speed
-        move_x = input_comp.move_x
-        move_y = input_comp.move_y
-        move_length = math.sqrt(move_x**2 + move_y**2)
-        if move_length > 0:
-            move_x = move_x / move_length
-            move_y = move_y / move_length
+        move_x, move_y = MOVE_DIRECTIONS[(input_comp.move_x, input_comp.move_y)]
         
         new_x = pos.x + move_x * vel.speed * dt
         new_y = pos.y + move_y * vel.speed * dt
@@ -777,14 +1214,6 @@ class MovementSystem(System):
         margin = size.hitbox_margin
         hitbox_size = size.width - margin * 2
         
-        # Check if player is already colliding (shouldn't happen, but safety check)
-        current_player_rect = (old_x + margin, old_y + margin, hitbox_size, hitbox_size)
-        
-        can_move_x = True
-        can_move_y = True
-        blocking_obstacle = None
-        
-        obstacles = []
         if self.world.spatial:
             query_margin = size.width * 2
             query_rect = (
@@ -793,111 +1222,38 @@ class MovementSystem(System):
                 size.width + query_margin * 2,
                 size.height + query_margin * 2
             )
-            for entity_id in self.world.spatial.query('obstacles', query_rect):
-                obstacle = self.world.get_entity(entity_id)
-                if obstacle:
-                    obstacles.append(obstacle)
+            obstacles = self.world.spatial.query('obstacles', query_rect)
         else:
             obstacles = gather_world_obstacles(self.world)
         
-        # Use consistent player hitbox for all collision checks
-        player_rect_new = (new_x + margin, new_y + margin, hitbox_size, hitbox_size)
-        player_rect_old = (old_x + margin, old_y + margin, hitbox_size, hitbox_size)
-        
+        # Resolve each obstacle's rect once; the kernel works on rects alone
+        obstacle_rects = []
         for obs in obstacles:
             obs_rect = get_entity_rect(obs)
-            if not obs_rect:
-                continue
-            
-            # Check collision with new position
-            if check_collision(player_rect_new, obs_rect):
-                blocking_obstacle = obs
-                # Test X-only and Y-only movement separately
-                test_x_rect = (new_x + margin, old_y + margin, hitbox_size, hitbox_size)
-                test_y_rect = (old_x + margin, new_y + margin, hitbox_size, hitbox_size)
-                
-                if check_collision(test_x_rect, obs_rect):
-                    can_move_x = False
-                if check_collision(test_y_rect, obs_rect):
-                    can_move_y = False
-                
-                # If both directions blocked, don't check other obstacles
-                if not can_move_x and not can_move_y:
-                    break
+            if obs_rect:
+                obstacle_rects.append(obs_rect)
         
-        # Improved corner sliding - only slide if very close to edge
-        if blocking_obstacle and (not can_move_x or not can_move_y):
-            obs_rect = get_entity_rect(blocking_obstacle)
-            if not obs_rect:
-                obs_rect = (0, 0, 0, 0)
-            
-            # Use hitbox centers for more accurate sliding
-            player_hitbox_center_x = old_x + margin + hitbox_size / 2
-            player_hitbox_center_y = old_y + margin + hitbox_size / 2
-            obs_center_x = obs_rect[0] + obs_rect[2] / 2
-            obs_center_y = obs_rect[1] + obs_rect[3] / 2
-            
-            # Only slide if we're very close to an edge (reduces edge catching)
-            slide_threshold = CORNER_SLIDE_THRESHOLD
-            
-            if input_comp.move_x != 0 and not can_move_x and can_move_y:
-                # Check distance to top and bottom edges of obstacle
-                top_edge_y = obs_rect[1] + obs_rect[3]
-                bot_edge_y = obs_rect[1]
-                top_dist = abs(player_hitbox_center_y - top_edge_y)
-                bot_dist = abs(player_hitbox_center_y - bot_edge_y)
-                
-                # Only slide if within threshold
-                if top_dist < slide_threshold:
-                    slide_y = vel.speed * dt * 0.3  # Reduced slide speed
-                    # Re-check collision after slide
-                    test_slide_rect = (new_x + margin, old_y + margin + slide_y, hitbox_size, hitbox_size)
-                    if not any(check_collision(test_slide_rect, get_entity_rect(o)) for o in obstacles if o != blocking_obstacle):
-                        new_y += slide_y
-                elif bot_dist < slide_threshold:
-                    slide_y = -vel.speed * dt * 0.3
-                    test_slide_rect = (new_x + margin, old_y + margin + slide_y, hitbox_size, hitbox_size)
-                    if not any(check_collision(test_slide_rect, get_entity_rect(o)) for o in obstacles if o != blocking_obstacle):
-                        new_y += slide_y
-            
-            if input_comp.move_y != 0 and not can_move_y and can_move_x:
-                # Check distance to left and right edges of obstacle
-                right_edge_x = obs_rect[0] + obs_rect[2]
-                left_edge_x = obs_rect[0]
-                right_dist = abs(player_hitbox_center_x - right_edge_x)
-                left_dist = abs(player_hitbox_center_x - left_edge_x)
-                
-                # Only slide if within threshold
-                if right_dist < slide_threshold:
-                    slide_x = vel.speed * dt * 0.3
-                    test_slide_rect = (old_x + margin + slide_x, new_y + margin, hitbox_size, hitbox_size)
-                    if not any(check_collision(test_slide_rect, get_entity_rect(o)) for o in obstacles if o != blocking_obstacle):
-                        new_x += slide_x
-                elif left_dist < slide_threshold:
-                    slide_x = -vel.speed * dt * 0.3
-                    test_slide_rect = (old_x + margin + slide_x, new_y + margin, hitbox_size, hitbox_size)
-                    if not any(check_collision(test_slide_rect, get_entity_rect(o)) for o in obstacles if o != blocking_obstacle):
-                        new_x += slide_x
+        final_x, final_y, moved_x, moved_y = resolve_move(
+            old_x, old_y, new_x, new_y, margin, hitbox_size, obstacle_rects,
+            input_comp.move_x, input_comp.move_y, vel.speed * dt * 0.3)
         
         # Calculate velocity for projectile inheritance
         if dt > 0:
-            player.velocity_x = (new_x - old_x) / dt if can_move_x else 0
-            player.velocity_y = (new_y - old_y) / dt if can_move_y else 0
-        
-        # Apply movement - but verify final position doesn't cause collision
-        final_x = new_x if can_move_x else old_x
-        final_y = new_y if can_move_y else old_y
-        final_player_rect = (final_x + margin, final_y + margin, hitbox_size, hitbox_size)
-        
-        # Double-check no collision at final position (prevents clipping)
-        for obs in obstacles:
-            obs_rect = get_entity_rect(obs)
-            if obs_rect and check_collision(final_player_rect, obs_rect):
-                # If we'd collide, revert to old position
-                final_x = old_x
-                final_y = old_y
-                break
-        
+            player.velocity_x = moved_x / dt
+            player.velocity_y = moved_y / dt
+        
+        # Keep in world bounds; the bounds are whole units, so plain compares
+        # replace the max/min calls
+        min_x = size.width // 2
+        min_y = size.height // 2
+        if final_x < min_x:
+            final_x = min_x
+        elif final_x > WORLD_WIDTH - min_x:
+            final_x = WORLD_WIDTH - min_x
+        if final_y < min_y:
+            final_y = min_y
+        elif final_y > WORLD_HEIGHT - min_y:
+            final_y = WORLD_HEIGHT - min_y
         pos.x = final_x
         pos.y = final_y
         
@@ -905,10 +1261,6 @@ class MovementSystem(System):
         if input_comp.move_x != 0 or input_comp.move_y != 0:
             player.last_direction_x = input_comp.move_x
             player.last_direction_y = input_comp.move_y
-        
-        # Keep in world bounds
-        pos.x = max(size.width // 2, min(WORLD_WIDTH - size.width // 2, pos.x))
-        pos.y = max(size.height // 2, min(WORLD_HEIGHT - size.height // 2, pos.y))
 
 
 class EnemyAISystem(System):
@@ -917,45 +1269,43 @@ class EnemyAISystem(System):
     
     def update(self, dt: float):
         # Get player position
-        player_entity = None
-        for entity in self.world.get_entities_with(PlayerComponent, PositionComponent, SizeComponent):
-            player_entity = entity
-            break
+        player_entity = self.world.player_entity
 
         if not player_entity:
             return
         
-        player_pos = player_entity.get_component(PositionComponent)
-        player_size = player_entity.get_component(SizeComponent)
+        player_pos = player_entity.position
+        player_size = player_entity.size
         player_x = player_pos.x + player_size.width / 2
         player_y = player_pos.y + player_size.height / 2
         
-        # Update each enemy
-        for entity in self.world.get_entities_with(EnemyComponent, PositionComponent, VelocityComponent, SizeComponent):
-            self._update_enemy(entity, player_x, player_y, dt)
+        # Update each enemy; far ones (off-screen, still closing in) skip
+        # pathfinding and enemy separation. Every enemy chases the same point,
+        # so its heading is worked out here once and handed down
+        activation_range_sq = ENEMY_ACTIVATION_RANGE * ENEMY_ACTIVATION_RANGE
+        sqrt = math.sqrt
+        for entity, _, pos, vel, _ in self.world.query(EnemyComponent, PositionComponent, VelocityComponent, SizeComponent):
+            dx = player_x - pos.x
+            dy = player_y - pos.y
+            distance_sq = dx * dx + dy * dy
+            if distance_sq == 0:
+                continue
+            inv_distance = 1.0 / sqrt(distance_sq)
+            if distance_sq > activation_range_sq:
+                self._chase_enemy(entity, vel, dx * inv_distance, dy * inv_distance, dt)
+            else:
+                self._update_enemy(entity, vel, dx * inv_distance, dy * inv_distance, dt)
     
     def _get_nearby_obstacles(self, rect):
         if self.world.spatial:
-            obstacles = []
-            ids = self.world.spatial.query('obstacles', rect)
-            for entity_id in ids:
-                obstacle = self.world.get_entity(entity_id)
-                if obstacle:
-                    obstacles.append(obstacle)
-            return obstacles
+            return self.world.spatial.query('obstacles', rect)
         return gather_world_obstacles(self.world)
     
     def _get_nearby_enemies(self, rect, exclude_entity_id):
         """Get nearby enemies excluding the current entity."""
         if self.world.spatial:
-            enemies = []
-            ids = self.world.spatial.query('enemies', rect)
-            for entity_id in ids:
-                if entity_id != exclude_entity_id:
-                    enemy = self.world.get_entity(entity_id)
-                    if enemy:
-                        enemies.append(enemy)
-            return enemies
+            return [enemy for enemy in self.world.spatial.query('enemies', rect)
+                    if enemy.id != exclude_entity_id]
         # Fallback: get all enemies
         enemies = []
         for e in self.world.get_entities_with(EnemyComponent, PositionComponent, SizeComponent):
@@ -963,20 +1313,29 @@ class EnemyAISystem(System):
                 enemies.append(e)
         return enemies
     
-    def _update_enemy(self, entity: Entity, player_x: float, player_y: float, dt: float):
-        pos = entity.get_component(PositionComponent)
-        vel = entity.get_component(VelocityComponent)
-        size = entity.get_component(SizeComponent)
-        enemy = entity.get_component(EnemyComponent)
+    def _update_enemy(self, entity: Entity, vel: VelocityComponent, dir_x: float, dir_y: float, dt: float):
+        pos = entity.position
+        size = entity.size
         entity_rect = (pos.x - ENEMY_PATHFINDING_RANGE, pos.y - ENEMY_PATHFINDING_RANGE,
                        size.width + ENEMY_PATHFINDING_RANGE * 2, size.height + ENEMY_PATHFINDING_RANGE * 2)
-        obstacles = self._get_nearby_obstacles(entity_rect)
-        
-        # Get nearby enemies for collision
-        nearby_enemies = self._get_nearby_enemies(entity_rect, entity.id)
+        # Resolve rects once; pathing, movement and the perpendicular fallback all reuse them
+        obstacle_rects = []
+        for obs in self._get_nearby_obstacles(entity_rect):
+            obs_rect = get_entity_rect(obs)
+            if obs_rect:
+                obstacle_rects.append((obs, obs_rect))
+        
+        # Obstacles, then nearby enemies, for movement collision. Enemy rects
+        # come from the per-position cache, so each neighbour's tuple is
+        # built once a frame rather than once per enemy that tests against it
+        blocker_rects = [obs_rect for _, obs_rect in obstacle_rects]
+        for other_enemy in self._get_nearby_enemies(entity_rect, entity.id):
+            other_rect = get_entity_rect(other_enemy)
+            if other_rect:
+                blocker_rects.append(other_rect)
         
         # Find path around obstacles
-        dir_x, dir_y = self._find_path(pos.x, pos.y, player_x, player_y, size.width, obstacles)
+        dir_x, dir_y = self._find_path(pos.x, pos.y, dir_x, dir_y, size.width, obstacle_rects)
         
         speed_per_frame = vel.speed * dt * 60
         new_x = pos.x + dir_x * speed_per_frame
@@ -984,38 +1343,25 @@ class EnemyAISystem(System):
         
         old_x, old_y = pos.x, pos.y
         
-        # Check collision with obstacles
-        enemy_rect = (new_x, new_y, size.width, size.height)
+        # Check collision with obstacles, then other enemies (comparisons
+        # inlined; this runs for every enemy against every nearby rect)
+        width = size.width
+        height = size.height
+        new_right = new_x + width
+        new_top = new_y + height
+        old_right = old_x + width
+        old_top = old_y + height
         can_move_x = True
         can_move_y = True
         
-        for obs in obstacles:
-            obs_rect = get_entity_rect(obs)
-            if not obs_rect:
-                continue
-            
-            if check_collision(enemy_rect, obs_rect):
-                test_x = (new_x, old_y, size.width, size.height)
-                test_y = (old_x, new_y, size.width, size.height)
-                
-                if check_collision(test_x, obs_rect):
-                    can_move_x = False
-                if check_collision(test_y, obs_rect):
-                    can_move_y = False
-        
-        # Check collision with other enemies
-        for other_enemy in nearby_enemies:
-            other_pos = other_enemy.get_component(PositionComponent)
-            other_size = other_enemy.get_component(SizeComponent)
-            other_rect = (other_pos.x, other_pos.y, other_size.width, other_size.height)
-            
-            if check_collision(enemy_rect, other_rect):
-                test_x = (new_x, old_y, size.width, size.height)
-                test_y = (old_x, new_y, size.width, size.height)
-                
-                if check_collision(test_x, other_rect):
+        for ox, oy, ow, oh in blocker_rects:
+            ox1 = ox + ow
+            oy1 = oy + oh
+            if new_x < ox1 and new_right > ox and new_y < oy1 and new_top > oy:
+                # Test X-only and Y-only movement separately
+                if old_y < oy1 and old_top > oy:
                     can_move_x = False
-                if check_collision(test_y, other_rect):
+                if old_x < ox1 and old_right > ox:
                     can_move_y = False
         
         # Try perpendicular movement if blocked
@@ -1023,27 +1369,15 @@ class EnemyAISystem(System):
             perp_x, perp_y = -dir_y, dir_x
             test_new_x = pos.x + perp_x * speed_per_frame
             test_new_y = pos.y + perp_y * speed_per_frame
-            test_rect = (test_new_x, test_new_y, size.width, size.height)
+            test_right = test_new_x + width
+            test_top = test_new_y + height
             
             can_move_perp = True
-            for obs in obstacles:
-                obs_rect = get_entity_rect(obs)
-                if not obs_rect:
-                    continue
-                if check_collision(test_rect, obs_rect):
+            for ox, oy, ow, oh in blocker_rects:
+                if test_new_x < ox + ow and test_right > ox and test_new_y < oy + oh and test_top > oy:
                     can_move_perp = False
                     break
             
-            # Also check perpendicular movement against other enemies
-            if can_move_perp:
-                for other_enemy in nearby_enemies:
-                    other_pos = other_enemy.get_component(PositionComponent)
-                    other_size = other_enemy.get_component(SizeComponent)
-                    other_rect = (other_pos.x, other_pos.y, other_size.width, other_size.height)
-                    if check_collision(test_rect, other_rect):
-                        can_move_perp = False
-                        break
-            
             if can_move_perp:
                 pos.x = test_new_x
                 pos.y = test_new_y
@@ -1053,28 +1387,57 @@ class EnemyAISystem(System):
             if can_move_y:
                 pos.y = new_y
     
-    def _find_path(self, x, y, target_x, target_y, size, obstacles):
-        dx = target_x - x
-        dy = target_y - y
-        distance = math.sqrt(dx**2 + dy**2)
-        
-        if distance == 0:
-            return (0, 0)
+    def _chase_enemy(self, entity: Entity, vel: VelocityComponent, dir_x: float, dir_y: float, dt: float):
+        """Straight-line chase for enemies outside ENEMY_ACTIVATION_RANGE.
+        Still stopped per axis by obstacles so they never end up inside one."""
+        pos = entity.position
+        size = entity.size
+        step = vel.speed * dt * 60
+        old_x, old_y = pos.x, pos.y
+        new_x = old_x + dir_x * step
+        new_y = old_y + dir_y * step
+        width = size.width
+        height = size.height
+        new_right = new_x + width
+        new_top = new_y + height
+        old_right = old_x + width
+        old_top = old_y + height
+        can_move_x = True
+        can_move_y = True
         
-        dir_x = dx / distance
-        dir_y = dy / distance
+        swept_rect = (min(old_x, new_x), min(old_y, new_y),
+                      abs(new_x - old_x) + width, abs(new_y - old_y) + height)
+        for obs in self._get_nearby_obstacles(swept_rect):
+            obs_rect = get_entity_rect(obs)
+            if not obs_rect:
+                continue
+            ox, oy, ow, oh = obs_rect
+            ox1 = ox + ow
+            oy1 = oy + oh
+            if new_x < ox1 and new_right > ox and new_y < oy1 and new_top > oy:
+                if old_y < oy1 and old_top > oy:
+                    can_move_x = False
+                if old_x < ox1 and old_right > ox:
+                    can_move_y = False
         
+        if can_move_x:
+            pos.x = new_x
+        if can_move_y:
+            pos.y = new_y
+    
+    def _find_path(self, x, y, dir_x, dir_y, size, obstacle_rects):
+        """Steer the unit heading (dir_x, dir_y) around the first obstacle in the way."""
         look_ahead = ENEMY_PATHFINDING_RANGE
         check_x = x + dir_x * look_ahead
         check_y = y + dir_y * look_ahead
-        check_rect = (check_x - size/2, check_y - size/2, size, size)
+        left = check_x - size/2
+        bottom = check_y - size/2
+        right = left + size
+        top = bottom + size
         
         blocking = None
-        for obs in obstacles:
-            obs_rect = get_entity_rect(obs)
-            if not obs_rect:
-                continue
-            if check_collision(check_rect, obs_rect):
+        for obs, (ox, oy, ow, oh) in obstacle_rects:
+            if left < ox + ow and right > ox and bottom < oy + oh and top > oy:
                 blocking = obs
                 break
         
@@ -1083,11 +1446,11 @@ class EnemyAISystem(System):
         
         # Steer around obstacle
         obs_center_x, obs_center_y = get_entity_center(blocking)
-        obs_size_comp = blocking.get_component(SizeComponent)
+        obs_size_comp = blocking.size
         
         avoid_dx = x - obs_center_x
         avoid_dy = y - obs_center_y
-        avoid_dist = math.sqrt(avoid_dx**2 + avoid_dy**2)
+        avoid_dist = math.hypot(avoid_dx, avoid_dy)
         
         if avoid_dist > 0:
             avoid_dx /= avoid_dist
@@ -1099,7 +1462,7 @@ class EnemyAISystem(System):
             steer_x = dir_x * (1.0 - avoid_strength) + avoid_dx * avoid_strength
             steer_y = dir_y * (1.0 - avoid_strength) + avoid_dy * avoid_strength
             
-            steer_len = math.sqrt(steer_x**2 + steer_y**2)
+            steer_len = math.hypot(steer_x, steer_y)
             if steer_len > 0:
                 steer_x /= steer_len
                 steer_y /= steer_len
@@ -1114,17 +1477,19 @@ class ProjectileSystem(System):
     priority = 20
     
     def update(self, dt: float):
-        for entity in self.world.get_entities_with(ProjectileComponent, PositionComponent, VelocityComponent):
-            pos = entity.get_component(PositionComponent)
-            vel = entity.get_component(VelocityComponent)
-            
-            pos.x += vel.dx
-            pos.y += vel.dy
+        remove_entity = self.world.remove_entity
+        min_x = min_y = -PROJECTILE_SIZE
+        max_x = WORLD_WIDTH + PROJECTILE_SIZE
+        max_y = WORLD_HEIGHT + PROJECTILE_SIZE
+        for entity, _, pos, vel in self.world.query(ProjectileComponent, PositionComponent, VelocityComponent):
+            x = pos.x + vel.dx
+            y = pos.y + vel.dy
+            pos.x = x
+            pos.y = y
             
             # Remove if off-world
-            if (pos.x < -PROJECTILE_SIZE or pos.x > WORLD_WIDTH + PROJECTILE_SIZE or
-                pos.y < -PROJECTILE_SIZE or pos.y > WORLD_HEIGHT + PROJECTILE_SIZE):
-                self.world.remove_entity(entity.id)
+            if x < min_x or x > max_x or y < min_y or y > max_y:
+                remove_entity(entity.id)
 
 
 class CollisionSystem(System):
@@ -1136,8 +1501,9 @@ class CollisionSystem(System):
         self.game_window = game_window
     
     def update(self, dt: float):
-        projectiles = list(self.world.get_entities_with(ProjectileComponent, PositionComponent, SizeComponent))
-        enemies = list(self.world.get_entities_with(EnemyComponent, PositionComponent, SizeComponent))
+        projectile_rows = self.world.query(ProjectileComponent, PositionComponent, SizeComponent)
+        enemy_rows = self.world.query(EnemyComponent, PositionComponent, SizeComponent)
+        enemies = [row[0] for row in enemy_rows]
         players = list(self.world.get_entities_with(PlayerComponent, PositionComponent, SizeComponent))
         spatial = self.world.spatial
         fallback_obstacles = gather_world_obstacles(self.world) if not spatial else []
@@ -1145,37 +1511,40 @@ class CollisionSystem(System):
         projectiles_to_remove = set()
         enemies_to_remove = set()
         
-        # Projectile vs Enemy
-        for proj in projectiles:
-            proj_pos = proj.get_component(PositionComponent)
-            proj_size = proj.get_component(SizeComponent)
-            proj_rect = (proj_pos.x, proj_pos.y, proj_size.width, proj_size.height)
-            if spatial:
-                enemy_ids = spatial.query('enemies', proj_rect)
-                nearby_enemies = []
-                for entity_id in enemy_ids:
-                    enemy_entity = self.world.get_entity(entity_id)
-                    if enemy_entity:
-                        nearby_enemies.append(enemy_entity)
-            else:
-                nearby_enemies = enemies
+        # Enemy edges (left, bottom, right, top) and shooter heights are shared
+        # by every projectile this frame
+        enemy_edges = {}
+        for enemy, _, enemy_pos, enemy_size in enemy_rows:
+            x = enemy_pos.x
+            y = enemy_pos.y
+            enemy_edges[enemy.id] = (x, y, x + enemy_size.width, y + enemy_size.height)
+        shooter_heights = {}
+        for player in players:
+            player_id = player.get_component(PlayerComponent).player_id
+            if player_id not in shooter_heights:
+                shooter_heights[player_id] = player.get_component(HeightComponent)
+        
+        # Projectiles vs enemies, then vs obstacles, in one pass
+        for proj, proj_owner, proj_pos, proj_size in projectile_rows:
+            px0 = proj_pos.x
+            py0 = proj_pos.y
+            px1 = px0 + proj_size.width
+            py1 = py0 + proj_size.height
+            proj_rect = (px0, py0, proj_size.width, proj_size.height)
+            nearby_enemies = spatial.query('enemies', proj_rect) if spatial else enemies
             
             for enemy in nearby_enemies:
-                enemy_pos = enemy.get_component(PositionComponent)
-                enemy_size = enemy.get_component(SizeComponent)
-                enemy_rect = (enemy_pos.x, enemy_pos.y, enemy_size.width, enemy_size.height)
+                if enemy.id in enemies_to_remove:
+                    continue
+                edges = enemy_edges.get(enemy.id)
+                if edges is None:
+                    continue
                 
-                if check_collision(proj_rect, enemy_rect):
+                ex0, ey0, ex1, ey1 = edges
+                if px0 < ex1 and px1 > ex0 and py0 < ey1 and py1 > ey0:
                     # Check height: player can only shoot enemies if player is exactly 1 level higher
-                    proj_owner = proj.get_component(ProjectileComponent)
-                    if proj_owner and proj_owner.owner_id:
-                        # Find player who shot
-                        shooter_height = None
-                        for player in players:
-                            player_comp = player.get_component(PlayerComponent)
-                            if player_comp.player_id == proj_owner.owner_id:
-                                shooter_height = player.get_component(HeightComponent)
-                                break
+                    if proj_owner.owner_id:
+                        shooter_height = shooter_heights.get(proj_owner.owner_id)
                         
                         if shooter_height:
                             enemy_height = enemy.get_component(HeightComponent)
@@ -1200,55 +1569,44 @@ class CollisionSystem(System):
                         if players:
                             player_comp = players[0].get_component(PlayerComponent)
                             player_comp.coins += 1
-        
-        # Projectile vs Obstacles
-        for proj in projectiles:
+            
             if proj.id in projectiles_to_remove:
                 continue
-            proj_pos = proj.get_component(PositionComponent)
-            proj_size = proj.get_component(SizeComponent)
-            proj_rect = (proj_pos.x, proj_pos.y, proj_size.width, proj_size.height)
-            nearby_obstacles = fallback_obstacles
-            if spatial:
-                ids = spatial.query('obstacles', proj_rect)
-                nearby_obstacles = []
-                for entity_id in ids:
-                    obstacle = self.world.get_entity(entity_id)
-                    if obstacle:
-                        nearby_obstacles.append(obstacle)
             
-            for obs in nearby_obstacles:
+            # First obstacle hit removes the projectile. The spatial query
+            # already tests exact rects, so any result is a hit
+            if spatial:
+                if spatial.query('obstacles', proj_rect):
+                    projectiles_to_remove.add(proj.id)
+                continue
+            for obs in fallback_obstacles:
                 obs_rect = get_entity_rect(obs)
                 if obs_rect and check_collision(proj_rect, obs_rect):
                     projectiles_to_remove.add(proj.id)
-                break
-                    
+                    break
+        
         # Enemy vs Player
         for player in players:
-            player_pos = player.get_component(PositionComponent)
-            player_size = player.get_component(SizeComponent)
+            player_pos = player.position
+            player_size = player.size
             margin = player_size.hitbox_margin
-            player_rect = (player_pos.x + margin, player_pos.y + margin,
-                          player_size.width - margin * 2, player_size.height - margin * 2)
+            px0 = player_pos.x + margin
+            py0 = player_pos.y + margin
+            px1 = px0 + player_size.hitbox_width
+            py1 = py0 + player_size.hitbox_height
+            player_rect = (px0, py0, player_size.hitbox_width, player_size.hitbox_height)
             
-            if spatial:
-                enemy_ids = spatial.query('enemies', player_rect)
-                nearby_enemies = []
-                for entity_id in enemy_ids:
-                    enemy_entity = self.world.get_entity(entity_id)
-                    if enemy_entity:
-                        nearby_enemies.append(enemy_entity)
-            else:
-                nearby_enemies = enemies
+            nearby_enemies = spatial.query('enemies', player_rect) if spatial else enemies
             
             for enemy in nearby_enemies:
                 if enemy.id in enemies_to_remove:
                     continue
-                enemy_pos = enemy.get_component(PositionComponent)
-                enemy_size = enemy.get_component(SizeComponent)
-                enemy_rect = (enemy_pos.x, enemy_pos.y, enemy_size.width, enemy_size.height)
+                edges = enemy_edges.get(enemy.id)
+                if edges is None:
+                    continue
                 
-                if check_collision(player_rect, enemy_rect):
+                ex0, ey0, ex1, ey1 = edges
+                if px0 < ex1 and px1 > ex0 and py0 < ey1 and py1 > ey0:
                     # Check height: enemies can't hurt players that are higher than them
                     player_height = player.get_component(HeightComponent)
                     enemy_height = enemy.get_component(HeightComponent)
@@ -1283,10 +1641,7 @@ class InteractionSystem(System):
     
     def update(self, dt: float):
         # Get player
-        player_entity = None
-        for entity in self.world.get_entities_with(PlayerComponent, PositionComponent, SizeComponent, InputComponent):
-            player_entity = entity
-            break
+        player_entity = self.world.player_entity
         
         if not player_entity:
             self.nearby_door = None
@@ -1294,8 +1649,8 @@ class InteractionSystem(System):
                 self.tooltip_text.visible = False
             return
         
-        player_pos = player_entity.get_component(PositionComponent)
-        player_size = player_entity.get_component(SizeComponent)
+        player_pos = player_entity.position
+        player_size = player_entity.size
         input_comp = player_entity.get_component(InputComponent)
         
         player_center_x = player_pos.x + player_size.width / 2
@@ -1306,7 +1661,7 @@ class InteractionSystem(System):
         min_dist = float('inf')
         
         for entity in self.world.get_entities_with(DoorComponent, PositionComponent, SizeComponent):
-            door_pos = entity.get_component(PositionComponent)
+            door_pos = entity.position
             door_center_x = door_pos.x
             door_center_y = door_pos.y
             
@@ -1326,72 +1681,55 @@ class InteractionSystem(System):
         
         if nearby_door and interact_just_pressed:
             door = nearby_door.get_component(DoorComponent)
-            door_pos = nearby_door.get_component(PositionComponent)
-            door_size = nearby_door.get_component(SizeComponent)
             
             # Check if something is blocking the door before allowing toggle
-            door_rect = (door_pos.x - door_size.width // 2, door_pos.y - door_size.height // 2,
-                        door_size.width, door_size.height)
+            door_rect = get_entity_footprint(nearby_door)
             
-            # Check for players, enemies, or other obstacles blocking the door
-            is_blocked = False
+            # Players, enemies and other obstacles (rocks, walls, etc.) all
+            # block the door; gather them into one candidate list. With a
+            # spatial index only the entities around the door are candidates
+            spatial = self.world.spatial
+            blockers = list(self.world.get_entities_with(PlayerComponent, PositionComponent, SizeComponent))
+            if spatial:
+                # Enemy cells are synced before the AI moves them, so pad the
+                # lookup by a cell and recheck against current rects
+                search_rect = (door_rect[0] - GRID_SIZE, door_rect[1] - GRID_SIZE,
+                               door_rect[2] + GRID_SIZE * 2, door_rect[3] + GRID_SIZE * 2)
+                blockers.extend(spatial.query('enemies', search_rect))
+                blockers.extend(spatial.query('obstacles', door_rect))
+            else:
+                blockers.extend(self.world.get_entities_with(EnemyComponent, PositionComponent, SizeComponent))
+                blockers.extend(gather_world_obstacles(self.world))
             
-            # Check players
-            for player_entity in self.world.get_entities_with(PlayerComponent, PositionComponent, SizeComponent):
-                player_pos = player_entity.get_component(PositionComponent)
-                player_size = player_entity.get_component(SizeComponent)
-                margin = player_size.hitbox_margin
-                player_rect = (player_pos.x + margin, player_pos.y + margin,
-                              player_size.width - margin * 2, player_size.height - margin * 2)
-                if check_collision(door_rect, player_rect):
+            is_blocked = False
+            for blocker in blockers:
+                if blocker is nearby_door:
+                    continue  # Skip the door itself
+                blocker_rect = get_entity_rect(blocker)
+                if blocker_rect and check_collision(door_rect, blocker_rect):
                     is_blocked = True
                     break
             
-            # Check enemies
-            if not is_blocked:
-                for enemy_entity in self.world.get_entities_with(EnemyComponent, PositionComponent, SizeComponent):
-                    enemy_pos = enemy_entity.get_component(PositionComponent)
-                    enemy_size = enemy_entity.get_component(SizeComponent)
-                    enemy_rect = (enemy_pos.x, enemy_pos.y, enemy_size.width, enemy_size.height)
-                    if check_collision(door_rect, enemy_rect):
-                        is_blocked = True
-                        break
-            
-            # Check other obstacles (rocks, walls, etc.)
-            if not is_blocked:
-                for obstacle_entity in self.world.get_entities_with(PositionComponent, SizeComponent, CollisionComponent):
-                    if obstacle_entity.id == nearby_door.id:
-                        continue  # Skip the door itself
-                    obs_coll = obstacle_entity.get_component(CollisionComponent)
-                    if obs_coll.layer != "obstacle":
-                        continue
-                    obs_pos = obstacle_entity.get_component(PositionComponent)
-                    obs_size = obstacle_entity.get_component(SizeComponent)
-                    obs_rect = get_entity_rect(obstacle_entity)
-                    if obs_rect and check_collision(door_rect, obs_rect):
-                        is_blocked = True
-                        break
-            
             # Only toggle if not blocked
             if not is_blocked:
                 door.is_open = not door.is_open
+                # Doors only block if they're closed AND blocking (player has moved away)
+                self.world.mark_obstacle(nearby_door, door.is_blocking and not door.is_open)
                 
                 # Update door visual
-                sprite_comp = nearby_door.get_component(SpriteComponent)
+                sprite_comp = nearby_door.sprite
                 if sprite_comp and sprite_comp.door_panel:
                     if door.is_open:
-                        sprite_comp.door_panel.color = (100, 100, 100)  # Gray when open
-                        sprite_comp.door_panel.opacity = 100
+                        sprite_comp.door_panel.color = (100, 100, 100, 100)  # Faded gray when open
                     else:
-                        sprite_comp.door_panel.color = (139, 90, 43)  # Brown when closed
-                        sprite_comp.door_panel.opacity = 255
+                        sprite_comp.door_panel.color = (139, 90, 43, 255)  # Solid brown when closed
         
         # Update tooltip
         if self.game_window and hasattr(self.game_window, 'door_tooltip'):
             if nearby_door:
                 door = nearby_door.get_component(DoorComponent)
-                door_pos = nearby_door.get_component(PositionComponent)
-                door_size = nearby_door.get_component(SizeComponent)
+                door_pos = nearby_door.position
+                door_size = nearby_door.size
                 
                 if door.is_open:
                     self.game_window.door_tooltip.text = "Press SPACE to close"
@@ -1415,68 +1753,56 @@ class StairsSystem(System):
     priority = 23
     
     def update(self, dt: float):
+        # Stairs rects are resolved once per frame into flat rows
+        # (left, bottom, right, top, center x, center y, dir x, dir y, from, to)
+        stairs_rows = []
+        for entity, stairs_comp, stairs_pos, _, _ in self.world.query(StairsComponent, PositionComponent, SizeComponent, HeightComponent):
+            left, bottom, width, height = get_entity_footprint(entity)
+            stairs_rows.append((left, bottom, left + width, bottom + height,
+                                stairs_pos.x, stairs_pos.y, stairs_comp.direction_x, stairs_comp.direction_y,
+                                stairs_comp.from_level, stairs_comp.to_level))
+        if not stairs_rows:
+            return
+        
         # Check players on stairs
-        for player_entity in self.world.get_entities_with(PlayerComponent, PositionComponent, SizeComponent, HeightComponent):
-            player_pos = player_entity.get_component(PositionComponent)
-            player_size = player_entity.get_component(SizeComponent)
-            player_height = player_entity.get_component(HeightComponent)
-            
-            player_center_x = player_pos.x + player_size.width / 2
-            player_center_y = player_pos.y + player_size.height / 2
-            player_rect = (player_pos.x, player_pos.y, player_size.width, player_size.height)
-            
-            # Check if player is on stairs
-            for stairs_entity in self.world.get_entities_with(StairsComponent, PositionComponent, SizeComponent, HeightComponent):
-                stairs_pos = stairs_entity.get_component(PositionComponent)
-                stairs_size = stairs_entity.get_component(SizeComponent)
-                stairs_comp = stairs_entity.get_component(StairsComponent)
-                stairs_height = stairs_entity.get_component(HeightComponent)
-                
-                stairs_rect = (stairs_pos.x - stairs_size.width // 2, stairs_pos.y - stairs_size.height // 2,
-                              stairs_size.width, stairs_size.height)
-                
-                if check_collision(player_rect, stairs_rect):
+        for _, _, player_pos, player_size, player_height in self.world.query(PlayerComponent, PositionComponent, SizeComponent, HeightComponent):
+            px0 = player_pos.x
+            py0 = player_pos.y
+            px1 = px0 + player_size.width
+            py1 = py0 + player_size.height
+            player_center_x = px0 + player_size.width / 2
+            player_center_y = py0 + player_size.height / 2
+            
+            for left, bottom, right, top, sx, sy, dx, dy, from_level, to_level in stairs_rows:
+                if px0 < right and px1 > left and py0 < top and py1 > bottom:
                     # Check if moving in stairs direction
-                    dx = stairs_comp.direction_x
-                    dy = stairs_comp.direction_y
                     if dx == 0 and dy == 0:
                         continue
                     
                     # Determine if going up or down based on player position relative to stairs
-                    player_to_stairs_dx = player_center_x - stairs_pos.x
-                    player_to_stairs_dy = player_center_y - stairs_pos.y
-                    dot_product = player_to_stairs_dx * dx + player_to_stairs_dy * dy
+                    dot_product = (player_center_x - sx) * dx + (player_center_y - sy) * dy
                     
                     if dot_product > 0:  # Moving in direction of stairs (going up)
-                        if player_height.level == stairs_comp.from_level:
-                            player_height.level = stairs_comp.to_level
+                        if player_height.level == from_level:
+                            player_height.level = to_level
                     else:  # Moving opposite direction (going down)
-                        if player_height.level == stairs_comp.to_level:
-                            player_height.level = stairs_comp.from_level
+                        if player_height.level == to_level:
+                            player_height.level = from_level
         
         # Check enemies on stairs
-        for enemy_entity in self.world.get_entities_with(EnemyComponent, PositionComponent, SizeComponent, HeightComponent):
-            enemy_pos = enemy_entity.get_component(PositionComponent)
-            enemy_size = enemy_entity.get_component(SizeComponent)
-            enemy_height = enemy_entity.get_component(HeightComponent)
-            
-            enemy_rect = (enemy_pos.x, enemy_pos.y, enemy_size.width, enemy_size.height)
-            
-            # Check if enemy is on stairs
-            for stairs_entity in self.world.get_entities_with(StairsComponent, PositionComponent, SizeComponent, HeightComponent):
-                stairs_pos = stairs_entity.get_component(PositionComponent)
-                stairs_size = stairs_entity.get_component(SizeComponent)
-                stairs_comp = stairs_entity.get_component(StairsComponent)
-                
-                stairs_rect = (stairs_pos.x - stairs_size.width // 2, stairs_pos.y - stairs_size.height // 2,
-                              stairs_size.width, stairs_size.height)
-                
-                if check_collision(enemy_rect, stairs_rect):
+        for _, _, enemy_pos, enemy_size, enemy_height in self.world.query(EnemyComponent, PositionComponent, SizeComponent, HeightComponent):
+            ex0 = enemy_pos.x
+            ey0 = enemy_pos.y
+            ex1 = ex0 + enemy_size.width
+            ey1 = ey0 + enemy_size.height
+            
+            for left, bottom, right, top, _, _, _, _, from_level, to_level in stairs_rows:
+                if ex0 < right and ex1 > left and ey0 < top and ey1 > bottom:
                     # Enemies automatically move up/down stairs based on direction
-                    if enemy_height.level == stairs_comp.from_level:
-                        enemy_height.level = stairs_comp.to_level
-                    elif enemy_height.level == stairs_comp.to_level:
-                        enemy_height.level = stairs_comp.from_level
+                    if enemy_height.level == from_level:
+                        enemy_height.level = to_level
+                    elif enemy_height.level == to_level:
+                        enemy_height.level = from_level
 
 
 class HarvestSystem(System):
@@ -1485,68 +1811,76 @@ class HarvestSystem(System):
     
     def update(self, dt: float):
         # Get player
-        player_entity = None
-        for entity in self.world.get_entities_with(PlayerComponent, PositionComponent, SizeComponent, InputComponent):
-            player_entity = entity
-            break
+        player_entity = self.world.player_entity
         
         if not player_entity:
             return
         
-        player_pos = player_entity.get_component(PositionComponent)
-        player_size = player_entity.get_component(SizeComponent)
+        player_pos = player_entity.position
+        player_size = player_entity.size
         player_comp = player_entity.get_component(PlayerComponent)
         input_comp = player_entity.get_component(InputComponent)
         
         player_center_x = player_pos.x + player_size.width / 2
         player_center_y = player_pos.y + player_size.height / 2
         
-        # Find nearby tree
+        # Find nearby tree; squared distances order the same as distances
         nearby_tree_id = None
-        min_dist = float('inf')
+        min_dist_sq = float('inf')
         
         if input_comp.harvest_pressed:
-            for entity in self.world.get_entities_with(TreeComponent, PositionComponent, SizeComponent):
-                tree = entity.get_component(TreeComponent)
-                if tree.is_chopped:
+            spatial = self.world.spatial
+            if spatial:
+                # Standing trees are obstacles, so only those around the player are candidates
+                candidates = spatial.query('obstacles', (player_center_x - HARVEST_RANGE, player_center_y - HARVEST_RANGE,
+                                                         HARVEST_RANGE * 2, HARVEST_RANGE * 2))
+            else:
+                candidates = self.world.get_entities_with(TreeComponent, PositionComponent, SizeComponent)
+            
+            for entity in candidates:
+                tree = entity.components.get(TreeComponent)
+                if tree is None or tree.is_chopped:
                     continue
                 
-                tree_pos = entity.get_component(PositionComponent)
+                tree_pos = entity.position
                 # Tree position is stored as center
-                tree_center_x = tree_pos.x
-                tree_center_y = tree_pos.y
-                
-                dx = player_center_x - tree_center_x
-                dy = player_center_y - tree_center_y
-                distance = math.sqrt(dx**2 + dy**2)
+                dx = player_center_x - tree_pos.x
+                dy = player_center_y - tree_pos.y
+                dist_sq = dx * dx + dy * dy
                 
-                if distance <= HARVEST_RANGE and distance < min_dist:
-                    min_dist = distance
+                if dist_sq <= HARVEST_RANGE_SQ and dist_sq < min_dist_sq:
+                    min_dist_sq = dist_sq
                     nearby_tree_id = entity.id
         
-        # Update all trees
-        for entity in self.world.get_entities_with(TreeComponent, PositionComponent, SizeComponent):
+        # Chop the target tree
+        chopping = self.world.chopping_trees
+        if nearby_tree_id is not None:
+            entity = self.world.get_entity(nearby_tree_id)
             tree = entity.get_component(TreeComponent)
-            
-            # Skip already chopped trees
-            if tree.is_chopped:
-                continue
-            
-            if entity.id == nearby_tree_id and input_comp.harvest_pressed:
-                tree.current_chopper = player_entity.id
-                tree.chop_progress += dt / TREE_CHOP_TIME
-                
-                if tree.chop_progress >= 1.0:
-                    tree.is_chopped = True
-                    player_comp.wood += 1
-                    # Hide sprites
-                    sprite = entity.get_component(SpriteComponent)
-                    if sprite:
-                        sprite.cleanup()
-                    self.world.remove_entity(entity.id)
-        else:
+            tree.current_chopper = player_entity.id
+            tree.chop_progress += dt / TREE_CHOP_TIME
+            chopping.add(nearby_tree_id)
+            
+            if tree.chop_progress >= 1.0:
+                tree.is_chopped = True
+                chopping.discard(nearby_tree_id)
+                self.world.mark_obstacle(entity, False)
+                player_comp.wood += 1
+                # Hide sprites
+                sprite = entity.sprite
+                if sprite:
+                    sprite.cleanup()
+                self.world.remove_entity(entity.id)
+        
+        # Trees this player stopped chopping lose their progress; untouched
+        # trees are never visited
+        if chopping:
+            for tree_id in [i for i in chopping if i != nearby_tree_id]:
+                chopping.discard(tree_id)
+                entity = self.world.get_entity(tree_id)
+                tree = entity.components.get(TreeComponent) if entity else None
                 # Only reset if this tree was being chopped by this player
-                if tree.current_chopper == player_entity.id:
+                if tree and tree.current_chopper == player_entity.id:
                     tree.current_chopper = None
                     tree.chop_progress = 0.0
 
@@ -1556,186 +1890,274 @@ class WallSystem(System):
     priority = 26
     
     def update(self, dt: float):
+        pending_walls = self.world.pending_walls
+        pending_doors = self.world.pending_doors
+        if not pending_walls and not pending_doors:
+            return
+        
         # Get player
-        player_entity = None
-        for entity in self.world.get_entities_with(PlayerComponent, PositionComponent, SizeComponent):
-            player_entity = entity
-            break
+        player_entity = self.world.player_entity
                 
         if not player_entity:
             return
         
-        player_pos = player_entity.get_component(PositionComponent)
-        player_size = player_entity.get_component(SizeComponent)
-        player_rect = (player_pos.x, player_pos.y, player_size.width, player_size.height)
-        
-        # Handle walls
-        for entity in self.world.get_entities_with(WallComponent, PositionComponent, SizeComponent):
+        player_pos = player_entity.position
+        player_size = player_entity.size
+        px0 = player_pos.x
+        py0 = player_pos.y
+        px1 = px0 + player_size.width
+        py1 = py0 + player_size.height
+        
+        # Handle walls - only freshly built walls still need the owner check
+        for wall_id in list(pending_walls):
+            entity = self.world.get_entity(wall_id)
+            if not entity:
+                pending_walls.discard(wall_id)
+                continue
             wall = entity.get_component(WallComponent)
-            if not wall.is_solid and wall.owner_id == player_entity.id:
-                wall_pos = entity.get_component(PositionComponent)
-                wall_size = entity.get_component(SizeComponent)
-                wall_rect = (wall_pos.x - wall_size.width // 2, wall_pos.y - wall_size.height // 2,
-                           wall_size.width, wall_size.height)
+            if wall.owner_id == player_entity.id:
+                left, bottom, width, height = get_entity_footprint(entity)
                 
-                if not check_collision(player_rect, wall_rect):
+                if not (px0 < left + width and px1 > left and
+                        py0 < bottom + height and py1 > bottom):
                     wall.is_solid = True
+                    self.world.mark_obstacle(entity, True)
+                    pending_walls.discard(wall_id)
         
         # Handle doors - make them blocking when closed and player moves away
-        for entity in self.world.get_entities_with(DoorComponent, PositionComponent, SizeComponent):
+        for door_id in list(pending_doors):
+            entity = self.world.get_entity(door_id)
+            if not entity:
+                pending_doors.discard(door_id)
+                continue
             door = entity.get_component(DoorComponent)
-            if not door.is_blocking and door.owner_id == player_entity.id and not door.is_open:
-                door_pos = entity.get_component(PositionComponent)
-                door_size = entity.get_component(SizeComponent)
-                door_rect = (door_pos.x - door_size.width // 2, door_pos.y - door_size.height // 2,
-                           door_size.width, door_size.height)
+            if door.owner_id == player_entity.id and not door.is_open:
+                left, bottom, width, height = get_entity_footprint(entity)
                 
-                if not check_collision(player_rect, door_rect):
+                if not (px0 < left + width and px1 > left and
+                        py0 < bottom + height and py1 > bottom):
                     door.is_blocking = True
+                    self.world.mark_obstacle(entity, True)
+                    pending_doors.discard(door_id)
 
 
 class RenderSystem(System):
     """Updates sprite positions based on camera."""
     priority = 100
     
+    def __init__(self):
+        super().__init__()
+        # Rows and camera offset each static kind was last placed with
+        self._placed: Dict[Type, tuple] = {}
+        self._offsets: Dict[tuple, tuple] = {}  # See _shape_offsets
+    
+    def _needs_placing(self, kind: Type, rows: List[tuple], cam_x: float, cam_y: float) -> bool:
+        """Trees, rocks, walls, doors and stairs never move, so their shapes
+        only need placing again once the camera moves or one of them is added
+        or removed (which hands query() a new rows list)."""
+        placed = self._placed.get(kind)
+        if placed is not None and placed[0] is rows and placed[1] == cam_x and placed[2] == cam_y:
+            return False
+        self._placed[kind] = (rows, cam_x, cam_y)
+        return True
+    
+    @staticmethod
+    def _cull(sprite_comp: SpriteComponent, screen_x: float, screen_y: float) -> bool:
+        """Hide sprite_comp once its corner leaves the screen (plus
+        CULL_MARGIN) and show it again on return. True means skip placing it."""
+        if not (-CULL_MARGIN < screen_x < SCREEN_WIDTH + CULL_MARGIN and -CULL_MARGIN < screen_y < SCREEN_HEIGHT + CULL_MARGIN):
+            if sprite_comp.on_screen:
+                sprite_comp.set_on_screen(False)
+            return True
+        if not sprite_comp.on_screen:
+            sprite_comp.set_on_screen(True)
+        return False
+    
+    def _shape_offsets(self, kind: Type, width, height, count: int) -> tuple:
+        """(dx, dy) of each shape from the entity's top-left screen corner.
+        Only a handful of (kind, size, shape count) combinations exist, so
+        the layout math runs once per combination rather than per frame."""
+        key = (kind, width, height, count)
+        offsets = self._offsets.get(key)
+        if offsets is None:
+            if kind is TreeComponent:
+                # Trunk (centered horizontally, at bottom), leaves above it,
+                # then the progress bar
+                offsets = ((width / 2 - width // 6, 0),
+                           (width / 2, height + height // 3),
+                           (width / 2 - (width + 10) // 2, height + 10))
+            elif kind is WallComponent:
+                # Main, border, then three grain lines
+                offsets = ((0, 0), (0, 0), (2, height // 4), (2, height // 2), (2, 3 * height // 4))
+            else:
+                # Stairs: base, then one step per shape
+                offsets = ((0, 0),) + tuple((0, (height // 3) * (i - 1)) for i in range(1, count))
+            self._offsets[key] = offsets
+        return offsets
+    
     def update(self, dt: float):
         camera = self.world.camera
         if not camera:
             return
         
-        for entity in self.world.get_entities_with(PositionComponent, SpriteComponent):
-            pos = entity.get_component(PositionComponent)
-            sprite_comp = entity.get_component(SpriteComponent)
-            size = entity.get_component(SizeComponent)
-            tree = entity.get_component(TreeComponent)
-            rock = entity.get_component(RockComponent)
-            wall = entity.get_component(WallComponent)
-            enemy = entity.get_component(EnemyComponent)
-            proj = entity.get_component(ProjectileComponent)
-            
+        # One pass per kind of renderable, so each loop only touches the
+        # components that kind draws with. Same math as camera.world_to_screen.
+        # Positions are set as a pair so each shape rewrites its vertices once
+        cam_x = camera.x
+        cam_y = camera.y
+        query = self.world.query
+        
+        # Sprite-only and sprite-or-shapes entities
+        for _, _, pos, sprite_comp in query(PlayerComponent, PositionComponent, SpriteComponent):
+            sprite = sprite_comp.sprite
+            if sprite and sprite_comp.visible:
+                sprite.position = (pos.x - cam_x, pos.y - cam_y, sprite.z)
+        
+        for _, _, pos, sprite_comp in query(EnemyComponent, PositionComponent, SpriteComponent):
             if not sprite_comp.visible:
                 continue
-            
-            screen_x, screen_y = camera.world_to_screen(pos.x, pos.y)
-            
-            # Handle player/enemy sprites
-            if sprite_comp.sprite:
-                offset_x = 0
-                offset_y = 0
-                if (tree or wall) and size:
-                    offset_x = -size.width / 2
-                    offset_y = -size.height / 2
-                sprite_comp.sprite.x = screen_x
-                sprite_comp.sprite.y = screen_y
-                if offset_x or offset_y:
-                    sprite_comp.sprite.x += offset_x
-                    sprite_comp.sprite.y += offset_y
-            
-            # Handle shape-based entities
-            if tree and not tree.is_chopped:
-                size_comp = entity.get_component(SizeComponent)
-                # Tree position is center, convert to top-left for rendering
-                tree_top_left_x = screen_x - size_comp.width / 2
-                tree_top_left_y = screen_y - size_comp.height / 2
-                
-                if len(sprite_comp.shapes) >= 2:
-                    # Trunk (centered horizontally, at bottom)
-                    sprite_comp.shapes[0].x = tree_top_left_x + size_comp.width / 2 - size_comp.width // 6
-                    sprite_comp.shapes[0].y = tree_top_left_y
-                    # Leaves (centered horizontally, above trunk)
-                    sprite_comp.shapes[1].x = tree_top_left_x + size_comp.width / 2
-                    sprite_comp.shapes[1].y = tree_top_left_y + size_comp.height + size_comp.height // 3
-                
-                # Update progress bar
-                if sprite_comp.progress_bar_bg and sprite_comp.progress_bar_fg:
-                    bar_width = size_comp.width + 10
-                    sprite_comp.progress_bar_bg.x = tree_top_left_x + size_comp.width / 2 - bar_width // 2
-                    sprite_comp.progress_bar_bg.y = tree_top_left_y + size_comp.height + 10
-                    sprite_comp.progress_bar_fg.x = sprite_comp.progress_bar_bg.x
-                    sprite_comp.progress_bar_fg.y = sprite_comp.progress_bar_bg.y
-                    
-                    if tree.current_chopper and tree.chop_progress > 0:
-                        sprite_comp.progress_bar_bg.visible = True
-                        sprite_comp.progress_bar_fg.visible = True
-                        sprite_comp.progress_bar_fg.width = bar_width * tree.chop_progress
-                else:
-                    sprite_comp.progress_bar_bg.visible = False
-                    sprite_comp.progress_bar_fg.visible = False
+            screen_x = pos.x - cam_x
+            screen_y = pos.y - cam_y
+            if self._cull(sprite_comp, screen_x, screen_y):
                 continue
-            
-            if rock:
+            sprite = sprite_comp.sprite
+            if sprite:
+                sprite.position = (screen_x, screen_y, sprite.z)
+            else:
                 for shape in sprite_comp.shapes:
-                    shape.x = screen_x
-                    shape.y = screen_y
+                    shape.position = (screen_x, screen_y)
+        
+        for _, _, pos, size, sprite_comp in query(ProjectileComponent, PositionComponent, SizeComponent, SpriteComponent):
+            if not sprite_comp.visible:
                 continue
-            
-            if wall:
-                size_comp = entity.get_component(SizeComponent)
-                half_w = size_comp.width // 2
-                half_h = size_comp.height // 2
-                actual_x = screen_x - half_w
-                actual_y = screen_y - half_h
-                
-                if len(sprite_comp.shapes) >= 5:
-                    sprite_comp.shapes[0].x = actual_x  # Main
-                    sprite_comp.shapes[0].y = actual_y
-                    sprite_comp.shapes[1].x = actual_x  # Border
-                    sprite_comp.shapes[1].y = actual_y
-                    sprite_comp.shapes[2].x = actual_x + 2  # Grain1
-                    sprite_comp.shapes[2].y = actual_y + size_comp.height // 4
-                    sprite_comp.shapes[3].x = actual_x + 2  # Grain2
-                    sprite_comp.shapes[3].y = actual_y + size_comp.height // 2
-                    sprite_comp.shapes[4].x = actual_x + 2  # Grain3
-                    sprite_comp.shapes[4].y = actual_y + 3 * size_comp.height // 4
+            screen_x = pos.x - cam_x
+            screen_y = pos.y - cam_y
+            if self._cull(sprite_comp, screen_x, screen_y):
                 continue
-            
-            door = entity.get_component(DoorComponent)
-            if door:
-                size_comp = entity.get_component(SizeComponent)
-                half_w = size_comp.width // 2
-                half_h = size_comp.height // 2
-                actual_x = screen_x - half_w
-                actual_y = screen_y - half_h
+            sprite = sprite_comp.sprite
+            if sprite:
+                sprite.position = (screen_x, screen_y, sprite.z)
+            else:
+                center_x = screen_x + size.width / 2
+                center_y = screen_y + size.height / 2
+                for shape in sprite_comp.shapes:
+                    shape.position = (center_x, center_y)
+        
+        # Trees: position is center, convert to top-left for rendering. They
+        # never move either, so only the progress bars of trees being chopped
+        # change between placements
+        rows = query(TreeComponent, PositionComponent, SizeComponent, SpriteComponent)
+        if self._needs_placing(TreeComponent, rows, cam_x, cam_y):
+            for _, tree, pos, size, sprite_comp in rows:
+                if not sprite_comp.visible:
+                    continue
+                tree_top_left_x = pos.x - cam_x - size.width / 2
+                tree_top_left_y = pos.y - cam_y - size.height / 2
+                if self._cull(sprite_comp, tree_top_left_x, tree_top_left_y):
+                    continue
+                sprite = sprite_comp.sprite
+                if sprite:
+                    sprite.position = (tree_top_left_x, tree_top_left_y, sprite.z)
+                if tree.is_chopped:
+                    continue
                 
-                if len(sprite_comp.shapes) >= 2:
-                    sprite_comp.shapes[0].x = actual_x  # Frame
-                    sprite_comp.shapes[0].y = actual_y
-                    if sprite_comp.door_panel:
-                        sprite_comp.door_panel.x = actual_x + 2
-                        sprite_comp.door_panel.y = actual_y + 2
-                continue
-            
-            stairs = entity.get_component(StairsComponent)
-            if stairs:
-                size_comp = entity.get_component(SizeComponent)
-                half_w = size_comp.width // 2
-                half_h = size_comp.height // 2
-                actual_x = screen_x - half_w
-                actual_y = screen_y - half_h
+                # create_tree always builds the trunk and leaves; they only go
+                # away once the tree is chopped
+                trunk, leaves = sprite_comp.shapes
+                (trunk_dx, trunk_dy), (leaves_dx, leaves_dy), (bar_dx, bar_dy) = self._shape_offsets(
+                    TreeComponent, size.width, size.height, 2)
+                trunk.position = (tree_top_left_x + trunk_dx, tree_top_left_y + trunk_dy)
+                leaves.position = (tree_top_left_x + leaves_dx, tree_top_left_y + leaves_dy)
                 
-                for i, shape in enumerate(sprite_comp.shapes):
-                    if i == 0:
-                        shape.x = actual_x  # Base
-                        shape.y = actual_y
-                    else:
-                        step_y = actual_y + (size_comp.height // 3) * (i - 1)
-                        shape.x = actual_x
-                        shape.y = step_y
+                bar_bg = sprite_comp.progress_bar_bg
+                bar_fg = sprite_comp.progress_bar_fg
+                if bar_bg and bar_fg:
+                    bar_bg.position = bar_fg.position = (tree_top_left_x + bar_dx, tree_top_left_y + bar_dy)
+        
+        # Update progress bars
+        for tree_id in self.world.chopping_trees:
+            entity = self.world.get_entity(tree_id)
+            if not entity:
                 continue
-            
-            if enemy and sprite_comp.shapes and not sprite_comp.sprite:
-                for shape in sprite_comp.shapes:
-                    shape.x = screen_x
-                    shape.y = screen_y
+            sprite_comp = entity.sprite
+            if not sprite_comp or not sprite_comp.visible or not sprite_comp.on_screen:
                 continue
-            
-            if proj and sprite_comp.shapes and not sprite_comp.sprite:
-                center_x = screen_x + (size.width if size else PROJECTILE_SIZE) / 2
-                center_y = screen_y + (size.height if size else PROJECTILE_SIZE) / 2
+            tree = entity.get_component(TreeComponent)
+            bar_bg = sprite_comp.progress_bar_bg
+            bar_fg = sprite_comp.progress_bar_fg
+            if bar_bg and bar_fg and tree.current_chopper and tree.chop_progress > 0:
+                bar_bg.visible = True
+                bar_fg.visible = True
+                bar_fg.width = (entity.size.width + 10) * tree.chop_progress
+        
+        rows = query(RockComponent, PositionComponent, SpriteComponent)
+        if self._needs_placing(RockComponent, rows, cam_x, cam_y):
+            for _, _, pos, sprite_comp in rows:
+                if not sprite_comp.visible:
+                    continue
+                screen_x = pos.x - cam_x
+                screen_y = pos.y - cam_y
+                if self._cull(sprite_comp, screen_x, screen_y):
+                    continue
+                if sprite_comp.sprite:
+                    sprite_comp.sprite.position = (screen_x, screen_y, sprite_comp.sprite.z)
                 for shape in sprite_comp.shapes:
-                    shape.x = center_x
-                    shape.y = center_y
-                continue
+                    shape.position = (screen_x, screen_y)
+            
+        # Walls, doors and stairs are centered on their grid cell
+        rows = query(WallComponent, PositionComponent, SizeComponent, SpriteComponent)
+        if self._needs_placing(WallComponent, rows, cam_x, cam_y):
+            for _, _, pos, size, sprite_comp in rows:
+                if not sprite_comp.visible:
+                    continue
+                actual_x = pos.x - cam_x - size.width // 2
+                actual_y = pos.y - cam_y - size.height // 2
+                if self._cull(sprite_comp, actual_x, actual_y):
+                    continue
+                sprite = sprite_comp.sprite
+                if sprite:
+                    sprite.position = (pos.x - cam_x - size.width / 2, pos.y - cam_y - size.height / 2, sprite.z)
+                
+                # Textured walls have no shapes; the zip leaves them untouched
+                for shape, (dx, dy) in zip(sprite_comp.shapes, self._shape_offsets(WallComponent, size.width, size.height, 5)):
+                    shape.position = (actual_x + dx, actual_y + dy)
+            
+        rows = query(DoorComponent, PositionComponent, SizeComponent, SpriteComponent)
+        if self._needs_placing(DoorComponent, rows, cam_x, cam_y):
+            for _, _, pos, size, sprite_comp in rows:
+                if not sprite_comp.visible:
+                    continue
+                screen_x = pos.x - cam_x
+                screen_y = pos.y - cam_y
+                if self._cull(sprite_comp, screen_x, screen_y):
+                    continue
+                if sprite_comp.sprite:
+                    sprite_comp.sprite.position = (screen_x, screen_y, sprite_comp.sprite.z)
+                actual_x = screen_x - size.width // 2
+                actual_y = screen_y - size.height // 2
+                
+                # Frame, then the panel inset by its border
+                frame, panel = sprite_comp.shapes
+                frame.position = (actual_x, actual_y)
+                panel.position = (actual_x + 2, actual_y + 2)
+            
+        rows = query(StairsComponent, PositionComponent, SizeComponent, SpriteComponent)
+        if self._needs_placing(StairsComponent, rows, cam_x, cam_y):
+            for _, _, pos, size, sprite_comp in rows:
+                if not sprite_comp.visible:
+                    continue
+                screen_x = pos.x - cam_x
+                screen_y = pos.y - cam_y
+                if self._cull(sprite_comp, screen_x, screen_y):
+                    continue
+                if sprite_comp.sprite:
+                    sprite_comp.sprite.position = (screen_x, screen_y, sprite_comp.sprite.z)
+                actual_x = screen_x - size.width // 2
+                actual_y = screen_y - size.height // 2
+                
+                shapes = sprite_comp.shapes
+                for shape, (dx, dy) in zip(shapes, self._shape_offsets(StairsComponent, size.width, size.height, len(shapes))):
+                    shape.position = (actual_x + dx, actual_y + dy)
 
 # ============================================================================
 # ENTITY FACTORIES
@@ -1745,23 +2167,28 @@ def create_player(world: World, x: float, y: float, player_id: int = 1, color=GR
     """Create a player entity with all required components."""
     entity = world.create_entity()
     
-    entity.add_component(PositionComponent(x=x, y=y))
-    entity.add_component(VelocityComponent(speed=PLAYER_SPEED))
-    entity.add_component(SizeComponent(width=PLAYER_SIZE, height=PLAYER_SIZE, hitbox_margin=PLAYER_HITBOX_MARGIN))
-    entity.add_component(PlayerComponent(player_id=player_id))
-    entity.add_component(InputComponent())
-    entity.add_component(HeightComponent(level=0))  # Players start at ground level
-    entity.add_component(CollisionComponent(layer="player", collides_with=["enemy", "obstacle"]))
-    entity.add_component(TagComponent(tags={"player"}))
-    
     # Create sprite
     sprite_comp = SpriteComponent()
-    format_str = 'RGBA'
-    pitch = PLAYER_SIZE * len(format_str)
-    data = bytes(color + (255,)) * (PLAYER_SIZE * PLAYER_SIZE)
-    image = pyglet.image.ImageData(PLAYER_SIZE, PLAYER_SIZE, format_str, data, pitch=-pitch)
-    sprite_comp.sprite = pyglet.sprite.Sprite(image, x=SCREEN_WIDTH // 2, y=SCREEN_HEIGHT // 2, batch=world.batch)
-    entity.add_component(sprite_comp)
+    if world.render_resources:
+        image = world.render_resources.get_player_image(color)
+    else:
+        format_str = 'RGBA'
+        pitch = PLAYER_SIZE * len(format_str)
+        data = bytes(color + (255,)) * (PLAYER_SIZE * PLAYER_SIZE)
+        image = pyglet.image.ImageData(PLAYER_SIZE, PLAYER_SIZE, format_str, data, pitch=-pitch)
+    sprite_comp.sprite = pyglet.sprite.Sprite(image, x=SCREEN_WIDTH // 2, y=SCREEN_HEIGHT // 2, batch=world.batch, group=world.actor_group)
+    
+    entity.add_components(
+        PositionComponent(x=x, y=y),
+        VelocityComponent(speed=PLAYER_SPEED),
+        SizeComponent(width=PLAYER_SIZE, height=PLAYER_SIZE, hitbox_margin=PLAYER_HITBOX_MARGIN),
+        PlayerComponent(player_id=player_id),
+        InputComponent(),
+        HeightComponent(level=0),  # Players start at ground level
+        CollisionComponent(layer="player", collides_with=["enemy", "obstacle"]),
+        TagComponent(mask=TAG_PLAYER),
+        sprite_comp,
+    )
     
     return entity
 
@@ -1769,24 +2196,24 @@ def create_enemy(world: World, x: float, y: float, enemy_id: int = None) -> Enti
     """Create an enemy entity."""
     entity = world.create_entity()
     
-    entity.add_component(PositionComponent(x=x, y=y))
-    entity.add_component(VelocityComponent(speed=ENEMY_SPEED))
-    entity.add_component(SizeComponent(width=ENEMY_SIZE, height=ENEMY_SIZE))
-    entity.add_component(EnemyComponent(enemy_id=enemy_id or random.randint(1000, 9999)))
-    entity.add_component(HeightComponent(level=0))  # Enemies start at ground level
-    entity.add_component(CollisionComponent(layer="enemy", collides_with=["player", "projectile"]))
-    entity.add_component(TagComponent(tags={"enemy"}))
-    
     sprite_comp = SpriteComponent()
     if world.render_resources:
         image = world.render_resources.get_enemy_image()
-        sprite_comp.sprite = pyglet.sprite.Sprite(image, batch=world.batch)
+        sprite_comp.sprite = pyglet.sprite.Sprite(image, batch=world.batch, group=world.actor_group)
     if not sprite_comp.sprite:
-        sprite_comp.add_shape(shapes.Rectangle(0, 0, ENEMY_SIZE, ENEMY_SIZE, color=RED, batch=world.batch))
-        border = shapes.Rectangle(0, 0, ENEMY_SIZE, ENEMY_SIZE, color=WHITE, batch=world.batch)
-        border.opacity = 128
-        sprite_comp.add_shape(border)
-    entity.add_component(sprite_comp)
+        sprite_comp.add_shape(shapes.Rectangle(0, 0, ENEMY_SIZE, ENEMY_SIZE, color=RED, batch=world.batch, group=world.actor_group))
+        sprite_comp.add_shape(shapes.Rectangle(0, 0, ENEMY_SIZE, ENEMY_SIZE, color=WHITE + (128,), batch=world.batch, group=world.actor_group))
+    
+    entity.add_components(
+        PositionComponent(x=x, y=y),
+        VelocityComponent(speed=ENEMY_SPEED),
+        SizeComponent(width=ENEMY_SIZE, height=ENEMY_SIZE),
+        EnemyComponent(enemy_id=enemy_id or random.randint(1000, 9999)),
+        HeightComponent(level=0),  # Enemies start at ground level
+        CollisionComponent(layer="enemy", collides_with=["player", "projectile"]),
+        TagComponent(mask=TAG_ENEMY),
+        sprite_comp,
+    )
     
     return entity
 
@@ -1795,11 +2222,12 @@ def create_projectile(world: World, x: float, y: float, direction_x: float, dire
     """Create a projectile entity."""
     entity = world.create_entity()
     
-    # Normalize direction
-    length = math.sqrt(direction_x**2 + direction_y**2)
-    if length > 0:
-        base_dx = (direction_x / length) * PROJECTILE_SPEED
-        base_dy = (direction_y / length) * PROJECTILE_SPEED
+    # Normalize direction, scaling straight to PROJECTILE_SPEED
+    length_sq = direction_x * direction_x + direction_y * direction_y
+    if length_sq > 0:
+        scale = PROJECTILE_SPEED / math.sqrt(length_sq)
+        base_dx = direction_x * scale
+        base_dy = direction_y * scale
     else:
         base_dx = 0
         base_dy = PROJECTILE_SPEED
@@ -1808,20 +2236,22 @@ def create_projectile(world: World, x: float, y: float, direction_x: float, dire
     velocity_per_frame_x = player_velocity_x / 60.0
     velocity_per_frame_y = player_velocity_y / 60.0
     
-    entity.add_component(PositionComponent(x=x, y=y))
-    entity.add_component(VelocityComponent(dx=base_dx + velocity_per_frame_x, dy=base_dy + velocity_per_frame_y, speed=PROJECTILE_SPEED))
-    entity.add_component(SizeComponent(width=PROJECTILE_SIZE, height=PROJECTILE_SIZE))
-    entity.add_component(ProjectileComponent(owner_id=owner_id))
-    entity.add_component(CollisionComponent(layer="projectile", collides_with=["enemy", "obstacle"]))
-    entity.add_component(TagComponent(tags={"projectile"}))
-    
     sprite_comp = SpriteComponent()
     if world.render_resources:
         image = world.render_resources.get_projectile_image()
-        sprite_comp.sprite = pyglet.sprite.Sprite(image, batch=world.batch)
+        sprite_comp.sprite = pyglet.sprite.Sprite(image, batch=world.batch, group=world.actor_group)
     if not sprite_comp.sprite:
-        sprite_comp.add_shape(shapes.Circle(0, 0, PROJECTILE_SIZE // 2, color=YELLOW, batch=world.batch))
-    entity.add_component(sprite_comp)
+        sprite_comp.add_shape(shapes.Circle(0, 0, PROJECTILE_SIZE // 2, color=YELLOW, batch=world.batch, group=world.actor_group))
+    
+    entity.add_components(
+        PositionComponent(x=x, y=y),
+        VelocityComponent(dx=base_dx + velocity_per_frame_x, dy=base_dy + velocity_per_frame_y, speed=PROJECTILE_SPEED),
+        SizeComponent(width=PROJECTILE_SIZE, height=PROJECTILE_SIZE),
+        ProjectileComponent(owner_id=owner_id),
+        CollisionComponent(layer="projectile", collides_with=["enemy", "obstacle"]),
+        TagComponent(mask=TAG_PROJECTILE),
+        sprite_comp,
+    )
     
     return entity
 
@@ -1829,19 +2259,29 @@ def create_rock(world: World, x: float, y: float, size: int) -> Entity:
     """Create a rock entity."""
     entity = world.create_entity()
     
-    entity.add_component(PositionComponent(x=x, y=y))
-    entity.add_component(SizeComponent(width=size, height=size))
-    entity.add_component(RockComponent(rock_id=random.randint(3000, 9999)))
-    entity.add_component(HeightComponent(level=1))  # Rocks have height 1
-    entity.add_component(CollisionComponent(layer="obstacle", collides_with=["player", "enemy", "projectile"]))
-    entity.add_component(TagComponent(tags={"rock", "obstacle"}))
+    batch = world.batch
+    group = world.terrain_group
+    
+    def build(sprite_comp: SpriteComponent):
+        sprite_comp.add_shape(shapes.Rectangle(0, 0, size, size, color=(100, 100, 100), batch=batch, group=group))
+        sprite_comp.add_shape(shapes.Rectangle(0, 0, size, size, color=(150, 150, 150, 200), batch=batch, group=group))
     
+    # Shapes are built once the rock first scrolls into view (see RenderSystem)
     sprite_comp = SpriteComponent()
-    sprite_comp.add_shape(shapes.Rectangle(0, 0, size, size, color=(100, 100, 100), batch=world.batch))
-    border = shapes.Rectangle(0, 0, size, size, color=(150, 150, 150), batch=world.batch)
-    border.opacity = 200
-    sprite_comp.add_shape(border)
-    entity.add_component(sprite_comp)
+    sprite_comp.builder = build
+    sprite_comp.on_screen = False
+    
+    entity.add_components(
+        PositionComponent(x=x, y=y),
+        SizeComponent(width=size, height=size),
+        RockComponent(rock_id=random.randint(3000, 9999)),
+        HeightComponent(level=1),  # Rocks have height 1
+        CollisionComponent(layer="obstacle", collides_with=["player", "enemy", "projectile"]),
+        TagComponent(mask=TAG_ROCK | TAG_OBSTACLE),
+        sprite_comp,
+    )
+    
+    world.mark_obstacle(entity, True)
     
     return entity
 
@@ -1849,24 +2289,36 @@ def create_tree(world: World, x: float, y: float, tree_id: int = None) -> Entity
     """Create a tree entity. x, y are center coordinates."""
     entity = world.create_entity()
     
-    entity.add_component(PositionComponent(x=x, y=y))
-    entity.add_component(SizeComponent(width=TREE_SIZE, height=TREE_SIZE))
-    entity.add_component(TreeComponent(tree_id=tree_id or random.randint(2000, 9999)))
-    entity.add_component(CollisionComponent(layer="obstacle", collides_with=["player", "enemy", "projectile"]))
-    entity.add_component(TagComponent(tags={"tree", "obstacle"}))
-    
+    batch = world.batch
+    group = world.terrain_group
+    
+    def build(sprite_comp: SpriteComponent):
+        # Trunk
+        sprite_comp.add_shape(shapes.Rectangle(0, 0, TREE_SIZE // 3, TREE_SIZE, color=(139, 69, 19), batch=batch, group=group))
+        # Leaves
+        sprite_comp.add_shape(shapes.Circle(0, 0, TREE_SIZE // 2, color=(34, 139, 34), batch=batch, group=group))
+        # Progress bar
+        bar_width = TREE_SIZE + 10
+        sprite_comp.progress_bar_bg = shapes.Rectangle(0, 0, bar_width, 4, color=(50, 50, 50), batch=batch, group=group)
+        sprite_comp.progress_bar_fg = shapes.Rectangle(0, 0, 0, 4, color=(0, 255, 0), batch=batch, group=group)
+        sprite_comp.progress_bar_bg.visible = False
+        sprite_comp.progress_bar_fg.visible = False
+    
+    # Shapes are built once the tree first scrolls into view (see RenderSystem)
     sprite_comp = SpriteComponent()
-    # Trunk
-    sprite_comp.add_shape(shapes.Rectangle(0, 0, TREE_SIZE // 3, TREE_SIZE, color=(139, 69, 19), batch=world.batch))
-    # Leaves
-    sprite_comp.add_shape(shapes.Circle(0, 0, TREE_SIZE // 2, color=(34, 139, 34), batch=world.batch))
-    # Progress bar
-    bar_width = TREE_SIZE + 10
-    sprite_comp.progress_bar_bg = shapes.Rectangle(0, 0, bar_width, 4, color=(50, 50, 50), batch=world.batch)
-    sprite_comp.progress_bar_fg = shapes.Rectangle(0, 0, 0, 4, color=(0, 255, 0), batch=world.batch)
-    sprite_comp.progress_bar_bg.visible = False
-    sprite_comp.progress_bar_fg.visible = False
-    entity.add_component(sprite_comp)
+    sprite_comp.builder = build
+    sprite_comp.on_screen = False
+    
+    entity.add_components(
+        PositionComponent(x=x, y=y, is_center=True),
+        SizeComponent(width=TREE_SIZE, height=TREE_SIZE),
+        TreeComponent(tree_id=tree_id or random.randint(2000, 9999)),
+        CollisionComponent(layer="obstacle", collides_with=["player", "enemy", "projectile"]),
+        TagComponent(mask=TAG_TREE | TAG_OBSTACLE),
+        sprite_comp,
+    )
+    
+    world.mark_obstacle(entity, True)
     
     return entity
 
@@ -1874,26 +2326,29 @@ def create_wall(world: World, x: float, y: float, owner_id: int = None) -> Entit
     """Create a wall entity."""
     entity = world.create_entity()
     
-    entity.add_component(PositionComponent(x=x, y=y))
-    entity.add_component(SizeComponent(width=WALL_SIZE, height=WALL_SIZE))
-    entity.add_component(WallComponent(owner_id=owner_id, is_solid=False))
-    entity.add_component(HeightComponent(level=1))  # Walls have height 1
-    entity.add_component(CollisionComponent(layer="obstacle", collides_with=["player", "enemy", "projectile"]))
-    entity.add_component(TagComponent(tags={"wall", "obstacle"}))
-    
     sprite_comp = SpriteComponent()
     if world.render_resources:
         image = world.render_resources.get_wall_image()
-        sprite_comp.sprite = pyglet.sprite.Sprite(image, batch=world.batch)
+        sprite_comp.sprite = pyglet.sprite.Sprite(image, batch=world.batch, group=world.terrain_group)
     else:
-        sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE, WALL_SIZE, color=(139, 90, 43), batch=world.batch))
-        border = shapes.Rectangle(0, 0, WALL_SIZE, WALL_SIZE, color=(101, 67, 33), batch=world.batch)
-        border.opacity = 200
-        sprite_comp.add_shape(border)
-        sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE - 4, 2, color=(120, 75, 35), batch=world.batch))
-        sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE - 4, 2, color=(120, 75, 35), batch=world.batch))
-        sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE - 4, 2, color=(120, 75, 35), batch=world.batch))
-    entity.add_component(sprite_comp)
+        sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE, WALL_SIZE, color=(139, 90, 43), batch=world.batch, group=world.terrain_group))
+        sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE, WALL_SIZE, color=(101, 67, 33, 200), batch=world.batch, group=world.terrain_group))
+        sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE - 4, 2, color=(120, 75, 35), batch=world.batch, group=world.terrain_group))
+        sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE - 4, 2, color=(120, 75, 35), batch=world.batch, group=world.terrain_group))
+        sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE - 4, 2, color=(120, 75, 35), batch=world.batch, group=world.terrain_group))
+    
+    entity.add_components(
+        PositionComponent(x=x, y=y, is_center=True),
+        SizeComponent(width=WALL_SIZE, height=WALL_SIZE),
+        WallComponent(owner_id=owner_id, is_solid=False),
+        HeightComponent(level=1),  # Walls have height 1
+        CollisionComponent(layer="obstacle", collides_with=["player", "enemy", "projectile"]),
+        TagComponent(mask=TAG_WALL | TAG_OBSTACLE),
+        sprite_comp,
+    )
+    
+    # WallSystem flips the wall to solid once the owner steps off it
+    world.pending_walls.add(entity.id)
     
     return entity
 
@@ -1901,20 +2356,25 @@ def create_door(world: World, x: float, y: float, owner_id: int = None) -> Entit
     """Create a door entity."""
     entity = world.create_entity()
     
-    entity.add_component(PositionComponent(x=x, y=y))
-    entity.add_component(SizeComponent(width=WALL_SIZE, height=WALL_SIZE))
-    entity.add_component(DoorComponent(owner_id=owner_id, is_open=False, is_blocking=False))
-    entity.add_component(HeightComponent(level=1))  # Doors have height 1 like walls
-    entity.add_component(CollisionComponent(layer="obstacle", collides_with=["player", "enemy", "projectile"]))
-    entity.add_component(TagComponent(tags={"door", "obstacle"}))
-    
     sprite_comp = SpriteComponent()
     # Door frame (always visible)
-    sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE, WALL_SIZE, color=(101, 67, 33), batch=world.batch))
+    sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE, WALL_SIZE, color=(101, 67, 33), batch=world.batch, group=world.terrain_group))
     # Door panel (changes color when open)
-    sprite_comp.door_panel = shapes.Rectangle(0, 0, WALL_SIZE - 4, WALL_SIZE - 4, color=(139, 90, 43), batch=world.batch)
+    sprite_comp.door_panel = shapes.Rectangle(0, 0, WALL_SIZE - 4, WALL_SIZE - 4, color=(139, 90, 43), batch=world.batch, group=world.terrain_group)
     sprite_comp.add_shape(sprite_comp.door_panel)
-    entity.add_component(sprite_comp)
+    
+    entity.add_components(
+        PositionComponent(x=x, y=y, is_center=True),
+        SizeComponent(width=WALL_SIZE, height=WALL_SIZE),
+        DoorComponent(owner_id=owner_id, is_open=False, is_blocking=False),
+        HeightComponent(level=1),  # Doors have height 1 like walls
+        CollisionComponent(layer="obstacle", collides_with=["player", "enemy", "projectile"]),
+        TagComponent(mask=TAG_DOOR | TAG_OBSTACLE),
+        sprite_comp,
+    )
+    
+    # WallSystem makes the door blocking once it is closed and the owner steps off it
+    world.pending_doors.add(entity.id)
     
     return entity
 
@@ -1922,28 +2382,34 @@ def create_stairs(world: World, x: float, y: float, direction_x: float, directio
     """Create a stairs entity."""
     entity = world.create_entity()
     
-    entity.add_component(PositionComponent(x=x, y=y))
-    entity.add_component(SizeComponent(width=WALL_SIZE, height=WALL_SIZE))
-    entity.add_component(StairsComponent(owner_id=owner_id, direction_x=direction_x, direction_y=direction_y, from_level=from_level, to_level=to_level))
-    entity.add_component(HeightComponent(level=from_level))  # Stairs are at the from_level
-    # Stairs don't block movement - they're just for changing height levels
-    # No CollisionComponent - stairs allow passage
-    entity.add_component(TagComponent(tags={"stairs"}))
-    
     sprite_comp = SpriteComponent()
     # Stairs base
-    sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE, WALL_SIZE, color=(120, 120, 120), batch=world.batch))
+    sprite_comp.add_shape(shapes.Rectangle(0, 0, WALL_SIZE, WALL_SIZE, color=(120, 120, 120), batch=world.batch, group=world.terrain_group))
     # Stairs steps
     for i in range(3):
         step_y = (WALL_SIZE // 3) * i
-        sprite_comp.add_shape(shapes.Rectangle(0, step_y, WALL_SIZE, WALL_SIZE // 6, color=(150, 150, 150), batch=world.batch))
-    entity.add_component(sprite_comp)
+        sprite_comp.add_shape(shapes.Rectangle(0, step_y, WALL_SIZE, WALL_SIZE // 6, color=(150, 150, 150), batch=world.batch, group=world.terrain_group))
+    
+    entity.add_components(
+        PositionComponent(x=x, y=y, is_center=True),
+        SizeComponent(width=WALL_SIZE, height=WALL_SIZE),
+        StairsComponent(owner_id=owner_id, direction_x=direction_x, direction_y=direction_y, from_level=from_level, to_level=to_level),
+        HeightComponent(level=from_level),  # Stairs are at the from_level
+        # Stairs don't block movement - they're just for changing height levels
+        # No CollisionComponent - stairs allow passage
+        TagComponent(mask=TAG_STAIRS),
+        sprite_comp,
+    )
     
     return entity
 
 def generate_rocks_ecs(world: World, num_rocks: int, exclude_x=None, exclude_y=None, exclude_radius=300):
     """Generate rocks using ECS."""
     rocks = []
+    # Rocks are all GRID_SIZE squares centered on snapped grid cells, so two
+    # overlap exactly when they share a cell; a set of taken centers replaces
+    # the pairwise rect scan
+    occupied = set()
     attempts = 0
     max_attempts = num_rocks * 30
     
@@ -1958,6 +2424,13 @@ def generate_rocks_ecs(world: World, num_rocks: int, exclude_x=None, exclude_y=N
     
     rocks_per_cluster = num_rocks // num_clusters
     remaining_rocks = num_rocks
+    size = GRID_SIZE
+    exclude_radius_sq = exclude_radius * exclude_radius
+    uniform = random.uniform
+    cos = math.cos
+    sin = math.sin
+    two_pi = 2 * math.pi
+    snap = _SNAP_TABLE
     
     for cluster_x, cluster_y in cluster_centers:
         cluster_rocks = 0
@@ -1967,34 +2440,30 @@ def generate_rocks_ecs(world: World, num_rocks: int, exclude_x=None, exclude_y=N
         while cluster_rocks < cluster_max and attempts < max_attempts:
             attempts += 1
             
-            angle = random.uniform(0, 2 * math.pi)
-            distance = random.uniform(0, cluster_radius)
-            x = cluster_x + math.cos(angle) * distance
-            y = cluster_y + math.sin(angle) * distance
-            x, y = snap_to_grid(x, y)
-            
-            size = GRID_SIZE
+            angle = uniform(0, two_pi)
+            distance = uniform(0, cluster_radius)
+            x = cluster_x + cos(angle) * distance
+            y = cluster_y + sin(angle) * distance
+            # Points off the world would snap outside the bounds check below,
+            # so drop them first and snap the rest straight from the table
+            if not (0 <= x < WORLD_WIDTH and 0 <= y < WORLD_HEIGHT):
+                continue
+            x = snap[int(x)]
+            y = snap[int(y)]
             
             if x < size or x > WORLD_WIDTH - size or y < size or y > WORLD_HEIGHT - size:
                 continue
             
             if exclude_x and exclude_y:
-                dist = math.sqrt((x - exclude_x)**2 + (y - exclude_y)**2)
-                if dist < exclude_radius:
+                dx = x - exclude_x
+                dy = y - exclude_y
+                if dx * dx + dy * dy < exclude_radius_sq:
                     continue
             
-            new_rect = (x - size // 2, y - size // 2, size, size)
-            overlap = False
-            for existing in rocks:
-                pos = existing.get_component(PositionComponent)
-                sz = existing.get_component(SizeComponent)
-                if check_collision(new_rect, (pos.x, pos.y, sz.width, sz.height)):
-                    overlap = True
-                    break
-            
-            if not overlap:
+            if (x, y) not in occupied:
                 entity = create_rock(world, x - size // 2, y - size // 2, size)
                 rocks.append(entity)
+                occupied.add((x, y))
                 cluster_rocks += 1
                 remaining_rocks -= 1
         
@@ -2008,52 +2477,51 @@ def generate_trees_ecs(world: World, num_trees: int, exclude_x=None, exclude_y=N
     trees = []
     attempts = 0
     max_attempts = num_trees * 20
-    existing_rocks = existing_rocks or []
+    exclude_radius_sq = exclude_radius * exclude_radius
+    randint = random.randint
+    # Rocks and placed trees share one grid, so each candidate is only tested
+    # against its neighbours rather than every rect placed so far
+    blockers = SpatialHash()
+    for rock in existing_rocks or []:
+        rock_rect = get_entity_rect(rock)
+        if rock_rect:
+            blockers.insert(rock_rect, rock)
     
     while len(trees) < num_trees and attempts < max_attempts:
         attempts += 1
-        x = random.randint(TREE_SIZE, WORLD_WIDTH - TREE_SIZE)
-        y = random.randint(TREE_SIZE, WORLD_HEIGHT - TREE_SIZE)
+        x = randint(TREE_SIZE, WORLD_WIDTH - TREE_SIZE)
+        y = randint(TREE_SIZE, WORLD_HEIGHT - TREE_SIZE)
         
         if exclude_x and exclude_y:
-            dist = math.sqrt((x - exclude_x)**2 + (y - exclude_y)**2)
-            if dist < exclude_radius:
+            dx = x - exclude_x
+            dy = y - exclude_y
+            if dx * dx + dy * dy < exclude_radius_sq:
                 continue
         
         # x, y are center coordinates, create rect for overlap checking
         new_rect = (x - TREE_SIZE // 2, y - TREE_SIZE // 2, TREE_SIZE, TREE_SIZE)
-        overlap = False
         
-        for existing in trees:
-            existing_rect = get_entity_rect(existing)
-            if existing_rect and check_collision(new_rect, existing_rect):
-                overlap = True
-                break
-        
-        if not overlap:
-            for rock in existing_rocks:
-                rock_rect = get_entity_rect(rock)
-                if rock_rect and check_collision(new_rect, rock_rect):
-                    overlap = True
-                    break
-        
-        if not overlap:
+        if not blockers.retrieve(new_rect):
             entity = create_tree(world, x, y)
             trees.append(entity)
+            blockers.insert(get_entity_rect(entity), entity)
     
     return trees
 
-def spawn_enemy_ecs(world: World, player_x=None, player_y=None, obstacles=None):
-    """Spawn an enemy at a valid location."""
-    obstacles = obstacles or []
+def spawn_enemy_ecs(world: World, player_x=None, player_y=None, obstacle_grid: Optional[SpatialHash] = None):
+    """Spawn an enemy at a valid location, clear of the rects in obstacle_grid."""
     max_attempts = 50
+    spawn_distance = max(SCREEN_WIDTH, SCREEN_HEIGHT) + 100
+    uniform = random.uniform
+    cos = math.cos
+    sin = math.sin
+    two_pi = 2 * math.pi
     
     for _ in range(max_attempts):
         if player_x is not None and player_y is not None:
-            spawn_distance = max(SCREEN_WIDTH, SCREEN_HEIGHT) + 100
-            angle = random.uniform(0, 2 * math.pi)
-            spawn_x = player_x + math.cos(angle) * spawn_distance
-            spawn_y = player_y + math.sin(angle) * spawn_distance
+            angle = uniform(0, two_pi)
+            spawn_x = player_x + cos(angle) * spawn_distance
+            spawn_y = player_y + sin(angle) * spawn_distance
             spawn_x = max(ENEMY_SIZE, min(WORLD_WIDTH - ENEMY_SIZE, spawn_x))
             spawn_y = max(ENEMY_SIZE, min(WORLD_HEIGHT - ENEMY_SIZE, spawn_y))
         else:
@@ -2072,19 +2540,8 @@ def spawn_enemy_ecs(world: World, player_x=None, player_y=None, obstacles=None):
                 spawn_y = random.randint(0, WORLD_HEIGHT)
         
         spawn_rect = (spawn_x, spawn_y, ENEMY_SIZE, ENEMY_SIZE)
-        valid = True
         
-        for obs in obstacles:
-            tree = obs.get_component(TreeComponent)
-            if tree and tree.is_chopped:
-                continue
-            pos = obs.get_component(PositionComponent)
-            sz = obs.get_component(SizeComponent)
-            if check_collision(spawn_rect, (pos.x, pos.y, sz.width, sz.height)):
-                valid = False
-                break
-        
-        if valid:
+        if obstacle_grid is None or not obstacle_grid.retrieve(spawn_rect):
             return create_enemy(world, spawn_x, spawn_y)
     
     # Fallback spawn
@@ -2102,6 +2559,42 @@ def spawn_enemy_ecs(world: World, player_x=None, player_y=None, obstacles=None):
 # NETWORK MANAGER
 # ============================================================================
 
+# Messages are framed as a '!I' length followed by a one-byte type tag. The
+# per-tick types have fixed binary layouts; anything else is sent as JSON.
+MSG_JSON = 0
+MSG_PLAYER_UPDATE = 1
+MSG_PROJECTILE = 2
+MSG_ENEMY_SPAWN = 3
+PLAYER_UPDATE_STRUCT = struct.Struct('!Bidd')  # tag, player id, x, y
+PROJECTILE_STRUCT = struct.Struct('!Bidddd')  # tag, owner id, x, y, dx, dy
+ENEMY_SPAWN_STRUCT = struct.Struct('!Bddi')  # tag, x, y, enemy id (0 if unset)
+
+def encode_message(data) -> bytes:
+    """Serialize a message dict into a tagged payload."""
+    msg_type = data.get('type')
+    if msg_type == 'player_update':
+        player = data['player']
+        return PLAYER_UPDATE_STRUCT.pack(MSG_PLAYER_UPDATE, player['id'], player['x'], player['y'])
+    if msg_type == 'projectile':
+        return PROJECTILE_STRUCT.pack(MSG_PROJECTILE, data['owner_id'], data['x'], data['y'], data['dx'], data['dy'])
+    if msg_type == 'enemy_spawn':
+        return ENEMY_SPAWN_STRUCT.pack(MSG_ENEMY_SPAWN, data['x'], data['y'], data.get('id') or 0)
+    return bytes((MSG_JSON,)) + json.dumps(data).encode('utf-8')
+
+def decode_message(payload):
+    """Inverse of encode_message."""
+    tag = payload[0]
+    if tag == MSG_PLAYER_UPDATE:
+        _, player_id, x, y = PLAYER_UPDATE_STRUCT.unpack(payload)
+        return {'type': 'player_update', 'player': {'id': player_id, 'x': x, 'y': y}}
+    if tag == MSG_PROJECTILE:
+        _, owner_id, x, y, dx, dy = PROJECTILE_STRUCT.unpack(payload)
+        return {'type': 'projectile', 'owner_id': owner_id, 'x': x, 'y': y, 'dx': dx, 'dy': dy}
+    if tag == MSG_ENEMY_SPAWN:
+        _, x, y, enemy_id = ENEMY_SPAWN_STRUCT.unpack(payload)
+        return {'type': 'enemy_spawn', 'x': x, 'y': y, 'id': enemy_id or None}
+    return json.loads(bytes(payload[1:]).decode('utf-8'))
+
 class NetworkManager:
     def __init__(self, is_host=False, host_ip='127.0.0.1'):
         self.is_host = is_host
@@ -2116,8 +2609,19 @@ class NetworkManager:
         self.send_interval = 1.0 / 20
         self.received_messages = []
         self.receive_lock = threading.Lock()
-        self.pending_data = b''
-        
+        self.pending_data = bytearray()  # Received bytes not yet parsed into messages
+        self._accept_selector = None  # Watches the listening socket while hosting
+        # Reused by _receive_thread so reads don't allocate a fresh bytes object each time
+        self._recv_buffer = bytearray(65536)
+        self._recv_view = memoryview(self._recv_buffer)
+        
+    @staticmethod
+    def _tune_socket(sock):
+        """Send small state packets immediately instead of letting Nagle batch them."""
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 262144)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 262144)
+    
     def start_host(self):
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -2125,6 +2629,8 @@ class NetworkManager:
             self.socket.bind(('0.0.0.0', self.port))
             self.socket.listen(1)
             self.socket.settimeout(1.0)
+            self._accept_selector = selectors.DefaultSelector()
+            self._accept_selector.register(self.socket, selectors.EVENT_READ)
             self.running = True
             print(f"Hosting on port {self.port}, waiting for connection...")
             return True
@@ -2133,10 +2639,15 @@ class NetworkManager:
             return False
     
     def accept_client(self):
-        if not self.is_host or not self.socket:
+        if not self.is_host or not self.socket or not self._accept_selector:
             return False
         try:
+            # Called from the UI thread every 0.1 s: poll for a pending
+            # connection instead of blocking in accept until it times out
+            if not self._accept_selector.select(timeout=0):
+                return False
             self.client_socket, addr = self.socket.accept()
+            self._tune_socket(self.client_socket)
             self.client_socket.settimeout(0.1)
             self.connected = True
             self.start_receive_thread()
@@ -2151,6 +2662,7 @@ class NetworkManager:
     def connect_to_host(self, host_ip):
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._tune_socket(self.socket)
             self.socket.settimeout(5.0)
             self.socket.connect((host_ip, self.port))
             self.socket.settimeout(0.1)
@@ -2174,8 +2686,7 @@ class NetworkManager:
         try:
             socket_to_use = self.client_socket if self.is_host else self.socket
             if socket_to_use:
-                data_str = json.dumps(data)
-                data_bytes = data_str.encode('utf-8')
+                data_bytes = encode_message(data)
                 length = struct.pack('!I', len(data_bytes))
                 socket_to_use.sendall(length + data_bytes)
                 self.last_send_time = current_time
@@ -2192,27 +2703,40 @@ class NetworkManager:
             self.receive_thread.start()
     
     def receive_data_non_blocking(self):
-        messages = []
+        # Hand over the whole queue and start a fresh one, so the lock is
+        # held for a swap rather than a copy
         with self.receive_lock:
-            if self.received_messages:
-                messages = self.received_messages[:]
-                self.received_messages.clear()
+            messages = self.received_messages
+            if not messages:
+                return []
+            self.received_messages = []
         return messages
     
     def _receive_thread(self):
+        # Wait for the socket to become readable rather than letting recv
+        # raise socket.timeout on every idle poll
+        selector = selectors.DefaultSelector()
+        watched = None
         while self.running and self.connected:
             try:
                 socket_to_use = self.client_socket if self.is_host else self.socket
                 if not socket_to_use:
                     time.sleep(0.01)
                     continue
+                if socket_to_use is not watched:
+                    if watched is not None:
+                        selector.unregister(watched)
+                    selector.register(socket_to_use, selectors.EVENT_READ)
+                    watched = socket_to_use
+                if not selector.select(timeout=0.1):
+                    continue
                 
                 try:
-                    chunk = socket_to_use.recv(4096)
-                    if not chunk:
+                    received = socket_to_use.recv_into(self._recv_view)
+                    if not received:
                         self.connected = False
                         break
-                    self.pending_data += chunk
+                    self.pending_data += self._recv_view[:received]
                 except socket.timeout:
                     continue
                 except Exception as e:
@@ -2221,32 +2745,45 @@ class NetworkManager:
                     self.connected = False
                     break
                 
-                while len(self.pending_data) >= 4:
-                    length = struct.unpack('!I', self.pending_data[:4])[0]
-                    if len(self.pending_data) >= 4 + length:
-                        data_bytes = self.pending_data[4:4+length]
-                        self.pending_data = self.pending_data[4+length:]
-                        try:
-                            message = json.loads(data_bytes.decode('utf-8'))
-                            with self.receive_lock:
-                                self.received_messages.append(message)
-                        except:
-                            pass
-                    else:
+                # Walk every complete frame with a read cursor, then drop the
+                # consumed prefix once instead of re-slicing per message
+                pending = self.pending_data
+                pos = 0
+                end = len(pending)
+                while end - pos >= 4:
+                    length = struct.unpack_from('!I', pending, pos)[0]
+                    if end - pos < 4 + length:
                         break
+                    data_bytes = pending[pos + 4:pos + 4 + length]
+                    pos += 4 + length
+                    try:
+                        message = decode_message(data_bytes)
+                        with self.receive_lock:
+                            self.received_messages.append(message)
+                    except:
+                        pass
+                if pos:
+                    del pending[:pos]
                         
             except Exception as e:
                 if self.running:
                     print(f"Thread error: {e}")
                 time.sleep(0.01)
+        selector.close()
     
     def close(self):
         self.running = False
         self.connected = False
+        if self._accept_selector:
+            self._accept_selector.close()
+            self._accept_selector = None
+        # Dropped after closing so a second close() is a no-op
         if self.client_socket:
             self.client_socket.close()
+            self.client_socket = None
         if self.socket:
             self.socket.close()
+            self.socket = None
 
 def get_local_ip():
     try:
@@ -2433,8 +2970,13 @@ class GameWindow(pyglet.window.Window):
         # Initialize ECS World
         self.world = World()
         self.world.batch = self.batch
+        # Draw order: world (terrain, then actors), reload arc, HUD
+        world_group = pyglet.graphics.Group(order=0)
+        self.world.terrain_group = pyglet.graphics.Group(order=0, parent=world_group)
+        self.world.actor_group = pyglet.graphics.Group(order=1, parent=world_group)
+        self.hud_group = pyglet.graphics.Group(order=2)
         self.world.camera = Camera()
-        self.world.spatial = SpatialPartition(WORLD_WIDTH, WORLD_HEIGHT)
+        self.world.spatial = SpatialPartition()
         self.world.render_resources = RenderResourceManager()
         
         # Network setup
@@ -2465,7 +3007,7 @@ class GameWindow(pyglet.window.Window):
             self.other_player_entity = None
         
         # Get player starting position for obstacle exclusion
-        player_pos = self.player_entity.get_component(PositionComponent)
+        player_pos = self.player_entity.position
         player_start_x = player_pos.x
         player_start_y = player_pos.y
         
@@ -2476,15 +3018,11 @@ class GameWindow(pyglet.window.Window):
         # Track pressed keys
         self.keys = pyglet.window.key.KeyStateHandler()
         self.push_handlers(self.keys)
-        self.arrow_keys_pressed = {
-            pyglet.window.key.UP: False,
-            pyglet.window.key.DOWN: False,
-            pyglet.window.key.LEFT: False,
-            pyglet.window.key.RIGHT: False
-        }
+        # Held arrow keys packed as ARROW_BITS flags
+        self.arrow_mask = 0
         
         # Add ECS Systems
-        self.world.add_system(InputSystem(self.keys, self.arrow_keys_pressed))
+        self.world.add_system(InputSystem(self.keys, self))
         self.world.add_system(SpatialPartitionSystem())
         self.world.add_system(MovementSystem())
         self.world.add_system(EnemyAISystem())
@@ -2507,8 +3045,15 @@ class GameWindow(pyglet.window.Window):
         self.is_night = False
         self.cycle_time = 0.0
         # Cached lighting color for smooth transitions
-        self.current_bg_color = [0.08, 0.08, 0.12, 1.0]  # Use list for mutable interpolation
-        self.target_bg_color = [0.08, 0.08, 0.12, 1.0]
+        # RGBA clear colour, eased towards the target each frame
+        self.current_bg_color = (0.08, 0.08, 0.12, 1.0)
+        self.target_bg_color = (0.08, 0.08, 0.12, 1.0)
+        self._clear_color = None  # Colour last handed to glClearColor
+        
+        # Obstacles considered for enemy spawn placement, rebuilt only when
+        # world.obstacle_version says obstacles were added or removed
+        self._spawn_obstacles: Optional[SpatialHash] = None
+        self._spawn_obstacles_version = -1
         
         # Build mode
         self.build_menu_open = False
@@ -2528,14 +3073,14 @@ class GameWindow(pyglet.window.Window):
         
         # Accept client connection if hosting
         if is_multiplayer and is_host:
-            pyglet.clock.schedule_once(lambda dt: self.check_connection(), 0.1)
+            pyglet.clock.schedule_interval(self.check_connection, 0.1)
     
     def _create_ui(self):
         """Create all UI elements."""
         # Build menu
         self.build_menu_bg = shapes.Rectangle(
             SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 80, 300, 75,
-            color=(30, 30, 30), batch=self.batch
+            color=(30, 30, 30), batch=self.batch, group=self.hud_group
         )
         self.build_menu_bg.opacity = 180
         self.build_menu_bg.visible = False
@@ -2545,7 +3090,7 @@ class GameWindow(pyglet.window.Window):
             font_name='Arial', font_size=10,
             x=SCREEN_WIDTH // 2, y=SCREEN_HEIGHT - 18,
             anchor_x='center', anchor_y='center',
-            color=(255, 255, 255, 255), batch=self.batch
+            color=(255, 255, 255, 255), batch=self.batch, group=self.hud_group
         )
         self.build_menu_title.visible = False
         
@@ -2554,7 +3099,7 @@ class GameWindow(pyglet.window.Window):
             font_name='Arial', font_size=12,
             x=SCREEN_WIDTH // 2, y=SCREEN_HEIGHT - 35,
             anchor_x='center', anchor_y='center',
-            color=(255, 255, 0, 255), batch=self.batch
+            color=(255, 255, 0, 255), batch=self.batch, group=self.hud_group
         )
         self.build_menu_item1.visible = False
         
@@ -2563,7 +3108,7 @@ class GameWindow(pyglet.window.Window):
             font_name='Arial', font_size=12,
             x=SCREEN_WIDTH // 2, y=SCREEN_HEIGHT - 50,
             anchor_x='center', anchor_y='center',
-            color=(255, 255, 0, 255), batch=self.batch
+            color=(255, 255, 0, 255), batch=self.batch, group=self.hud_group
         )
         self.build_menu_item2.visible = False
         
@@ -2572,7 +3117,7 @@ class GameWindow(pyglet.window.Window):
             font_name='Arial', font_size=12,
             x=SCREEN_WIDTH // 2, y=SCREEN_HEIGHT - 65,
             anchor_x='center', anchor_y='center',
-            color=(255, 255, 0, 255), batch=self.batch
+            color=(255, 255, 0, 255), batch=self.batch, group=self.hud_group
         )
         self.build_menu_item3.visible = False
         
@@ -2581,38 +3126,43 @@ class GameWindow(pyglet.window.Window):
             '0', font_name='Arial', font_size=14,
             x=SCREEN_WIDTH - 10, y=SCREEN_HEIGHT - 18,
             anchor_x='right', anchor_y='center',
-            color=WHITE, batch=self.batch
+            color=WHITE, batch=self.batch, group=self.hud_group
         )
         
         # Wood icon and counter
         log_y = SCREEN_HEIGHT - 20
         log_x = 10
-        self.wood_icon = shapes.Rectangle(log_x, log_y - 12, 14, 12, color=(139, 90, 43), batch=self.batch)
-        self.wood_top = shapes.Circle(log_x + 7, log_y - 1, 7, color=(139, 90, 43), batch=self.batch)
-        self.wood_bottom = shapes.Circle(log_x + 7, log_y - 12, 7, color=(139, 90, 43), batch=self.batch)
-        self.wood_ring1 = shapes.Circle(log_x + 7, log_y - 1, 4, color=(120, 75, 35), batch=self.batch)
-        self.wood_ring2 = shapes.Circle(log_x + 7, log_y - 1, 2, color=(101, 67, 33), batch=self.batch)
-        self.wood_label = pyglet.text.Label('0', font_name='Arial', font_size=16, x=30, y=log_y - 6, anchor_y='center', color=WHITE, batch=self.batch)
+        self.wood_icon = shapes.Rectangle(log_x, log_y - 12, 14, 12, color=(139, 90, 43), batch=self.batch, group=self.hud_group)
+        self.wood_top = shapes.Circle(log_x + 7, log_y - 1, 7, color=(139, 90, 43), batch=self.batch, group=self.hud_group)
+        self.wood_bottom = shapes.Circle(log_x + 7, log_y - 12, 7, color=(139, 90, 43), batch=self.batch, group=self.hud_group)
+        self.wood_ring1 = shapes.Circle(log_x + 7, log_y - 1, 4, color=(120, 75, 35), batch=self.batch, group=self.hud_group)
+        self.wood_ring2 = shapes.Circle(log_x + 7, log_y - 1, 2, color=(101, 67, 33), batch=self.batch, group=self.hud_group)
+        self.wood_label = pyglet.text.Label('0', font_name='Arial', font_size=16, x=30, y=log_y - 6, anchor_y='center', color=WHITE, batch=self.batch, group=self.hud_group)
         
         # Coin icon and counter (moved down to avoid overlap with wood)
         coin_y = SCREEN_HEIGHT - 50  # Increased gap from 20 to 30 pixels
-        self.coin_icon = shapes.Circle(16, coin_y, 8, color=(255, 215, 0), batch=self.batch)
-        self.coin_highlight = shapes.Circle(16, coin_y, 5, color=(255, 235, 100), batch=self.batch)
-        self.coin_label = pyglet.text.Label('0', font_name='Arial', font_size=16, x=30, y=coin_y, anchor_y='center', color=WHITE, batch=self.batch)
+        self.coin_icon = shapes.Circle(16, coin_y, 8, color=(255, 215, 0), batch=self.batch, group=self.hud_group)
+        self.coin_highlight = shapes.Circle(16, coin_y, 5, color=(255, 235, 100), batch=self.batch, group=self.hud_group)
+        self.coin_label = pyglet.text.Label('0', font_name='Arial', font_size=16, x=30, y=coin_y, anchor_y='center', color=WHITE, batch=self.batch, group=self.hud_group)
         
         # Day/Night cycle labels
-        self.day_label = pyglet.text.Label('Day 1', font_name='Arial', font_size=18, x=10, y=30, color=(255, 200, 50, 255), batch=self.batch)
-        self.time_label = pyglet.text.Label('Daytime - Gather resources!', font_name='Arial', font_size=14, x=10, y=10, color=(255, 255, 150, 255), batch=self.batch)
+        self.day_label = pyglet.text.Label('Day 1', font_name='Arial', font_size=18, x=10, y=30, color=(255, 200, 50, 255), batch=self.batch, group=self.hud_group)
+        self.time_label = pyglet.text.Label('Daytime - Gather resources!', font_name='Arial', font_size=14, x=10, y=10, color=(255, 255, 150, 255), batch=self.batch, group=self.hud_group)
         
         # Night warning
         self.night_warning = pyglet.text.Label(
             'NIGHT APPROACHES!', font_name='Arial', font_size=24,
             x=SCREEN_WIDTH // 2, y=SCREEN_HEIGHT // 2 + 50,
             anchor_x='center', anchor_y='center',
-            color=(255, 50, 50, 255), batch=self.batch
+            color=(255, 50, 50, 255), batch=self.batch, group=self.hud_group
         )
         self.night_warning.visible = False
         self.night_warning_timer = 0.0
+        # Last values written to the HUD labels; text is only reassigned
+        # when these change so pyglet doesn't re-layout every frame
+        self._last_warning_secs = -1
+        self._last_time_label = None
+        self._last_day_count = self.day_count
         
         # Connection label for multiplayer
         if self.is_multiplayer:
@@ -2621,12 +3171,15 @@ class GameWindow(pyglet.window.Window):
                 font_name='Arial', font_size=14,
                 x=10, y=SCREEN_HEIGHT - 65,
                 color=GREEN if (self.network and self.network.connected) else YELLOW,
-                batch=self.batch
+                batch=self.batch, group=self.hud_group
             )
         
         # Reload indicator
+        # Shapes sit at the group origin; the group follows the player sprite
+        # and is ordered between the world and the HUD
         self.reload_circle_radius = 5
-        self.reload_circle_bg = shapes.Circle(0, 0, self.reload_circle_radius, color=(50, 50, 50), batch=self.batch)
+        self.reload_group = TranslateGroup(self, order=1)
+        self.reload_circle_bg = shapes.Circle(0, 0, self.reload_circle_radius, color=(50, 50, 50), batch=self.batch, group=self.reload_group)
         self.reload_circle_bg.opacity = 150
         self.reload_arc_segments = []
         
@@ -2636,53 +3189,44 @@ class GameWindow(pyglet.window.Window):
             font_name='Arial', font_size=14,
             x=SCREEN_WIDTH // 2, y=SCREEN_HEIGHT - 100,
             anchor_x='center', anchor_y='center',
-            color=(255, 255, 200, 255), batch=self.batch
+            color=(255, 255, 200, 255), batch=self.batch, group=self.hud_group
         )
         self.door_tooltip.visible = False
     
-    def check_connection(self):
-        if self.network and not self.network.connected:
-            if self.network.accept_client():
-                if hasattr(self, 'connection_label'):
-                    self.connection_label.text = 'Connected'
-                    self.connection_label.color = GREEN
-            pyglet.clock.schedule_once(lambda dt: self.check_connection(), 0.1)
+    def check_connection(self, dt=0):
+        # Polled every 0.1 s while hosting, until a client connects or the window closes
+        if not self.network or self.network.connected:
+            pyglet.clock.unschedule(self.check_connection)
+            return
+        if self.network.accept_client():
+            pyglet.clock.unschedule(self.check_connection)
+            if hasattr(self, 'connection_label'):
+                self.connection_label.text = 'Connected'
+                self.connection_label.color = GREEN
     
     def on_key_press(self, symbol, modifiers):
-        if symbol == pyglet.window.key.UP:
-            self.arrow_keys_pressed[pyglet.window.key.UP] = True
-        elif symbol == pyglet.window.key.DOWN:
-            self.arrow_keys_pressed[pyglet.window.key.DOWN] = True
-        elif symbol == pyglet.window.key.LEFT:
-            self.arrow_keys_pressed[pyglet.window.key.LEFT] = True
-        elif symbol == pyglet.window.key.RIGHT:
-            self.arrow_keys_pressed[pyglet.window.key.RIGHT] = True
-        elif symbol == pyglet.window.key.F:
+        bit = ARROW_BITS.get(symbol)
+        if bit:
+            self.arrow_mask |= bit
+            return
+        
+        if symbol == BUILD_KEY:
             if self.build_menu_open:
                 self.try_build()
             else:
                 self.toggle_build_menu(True)
-        elif self.build_menu_open:
-            if symbol == pyglet.window.key._1 or symbol == pyglet.window.key.NUM_1:
-                self.select_building(1)
-            elif symbol == pyglet.window.key._2 or symbol == pyglet.window.key.NUM_2:
-                self.select_building(2)
-            elif symbol == pyglet.window.key._3 or symbol == pyglet.window.key.NUM_3:
-                self.select_building(3)
-        
-        if symbol == pyglet.window.key.ESCAPE:
+        elif symbol == CANCEL_KEY:
             if self.build_menu_open:
                 self.toggle_build_menu(False)
+        elif self.build_menu_open:
+            building_id = BUILDING_SELECT_KEYS.get(symbol)
+            if building_id:
+                self.select_building(building_id)
     
     def on_key_release(self, symbol, modifiers):
-        if symbol == pyglet.window.key.UP:
-            self.arrow_keys_pressed[pyglet.window.key.UP] = False
-        elif symbol == pyglet.window.key.DOWN:
-            self.arrow_keys_pressed[pyglet.window.key.DOWN] = False
-        elif symbol == pyglet.window.key.LEFT:
-            self.arrow_keys_pressed[pyglet.window.key.LEFT] = False
-        elif symbol == pyglet.window.key.RIGHT:
-            self.arrow_keys_pressed[pyglet.window.key.RIGHT] = False
+        bit = ARROW_BITS.get(symbol)
+        if bit:
+            self.arrow_mask &= ~bit
     
     def toggle_build_menu(self, show):
         self.build_menu_open = show
@@ -2710,8 +3254,8 @@ class GameWindow(pyglet.window.Window):
         resource = building['resource']
         
         player_comp = self.player_entity.get_component(PlayerComponent)
-        player_pos = self.player_entity.get_component(PositionComponent)
-        player_size = self.player_entity.get_component(SizeComponent)
+        player_pos = self.player_entity.position
+        player_size = self.player_entity.size
         
         if resource == 'wood' and player_comp.wood >= cost:
             player_center_x = player_pos.x + player_size.width / 2
@@ -2723,32 +3267,26 @@ class GameWindow(pyglet.window.Window):
             
             # Check existing buildings and obstacles
             for entity in self.world.get_entities_with(WallComponent, PositionComponent, SizeComponent):
-                pos = entity.get_component(PositionComponent)
-                sz = entity.get_component(SizeComponent)
-                if check_collision(build_rect, (pos.x - sz.width // 2, pos.y - sz.height // 2, sz.width, sz.height)):
+                if check_collision(build_rect, get_entity_footprint(entity)):
                     can_build = False
                     break
             
             if can_build:
                 for entity in self.world.get_entities_with(DoorComponent, PositionComponent, SizeComponent):
-                    pos = entity.get_component(PositionComponent)
-                    sz = entity.get_component(SizeComponent)
-                    if check_collision(build_rect, (pos.x - sz.width // 2, pos.y - sz.height // 2, sz.width, sz.height)):
+                    if check_collision(build_rect, get_entity_footprint(entity)):
                         can_build = False
                         break
             
             if can_build:
                 for entity in self.world.get_entities_with(StairsComponent, PositionComponent, SizeComponent):
-                    pos = entity.get_component(PositionComponent)
-                    sz = entity.get_component(SizeComponent)
-                    if check_collision(build_rect, (pos.x - sz.width // 2, pos.y - sz.height // 2, sz.width, sz.height)):
+                    if check_collision(build_rect, get_entity_footprint(entity)):
                         can_build = False
                         break
             
             if can_build:
                 for entity in self.world.get_entities_with(RockComponent, PositionComponent, SizeComponent):
-                    pos = entity.get_component(PositionComponent)
-                    sz = entity.get_component(SizeComponent)
+                    pos = entity.position
+                    sz = entity.size
                     if check_collision(build_rect, (pos.x, pos.y, sz.width, sz.height)):
                         can_build = False
                         break
@@ -2774,8 +3312,8 @@ class GameWindow(pyglet.window.Window):
                         if not entity_height or entity_height.level <= current_level:
                             continue
                         
-                        entity_pos = entity.get_component(PositionComponent)
-                        entity_size = entity.get_component(SizeComponent)
+                        entity_pos = entity.position
+                        entity_size = entity.size
                         entity_center_x = entity_pos.x
                         entity_center_y = entity_pos.y
                         
@@ -2789,7 +3327,7 @@ class GameWindow(pyglet.window.Window):
                     
                     # Calculate direction towards target (or default direction if no target)
                     if target_entity:
-                        target_pos = target_entity.get_component(PositionComponent)
+                        target_pos = target_entity.position
                         dir_x = target_pos.x - grid_x
                         dir_y = target_pos.y - grid_y
                         dir_length = math.sqrt(dir_x**2 + dir_y**2)
@@ -2810,27 +3348,32 @@ class GameWindow(pyglet.window.Window):
                     create_stairs(self.world, grid_x, grid_y, dir_x, dir_y, current_level, target_level, self.player_entity.id)
                     player_comp.wood -= cost
     
+    def _get_spawn_obstacles(self):
+        """Grid of every standing obstacle's rect, rebuilt only when the
+        obstacle set changes, so each spawn attempt checks a few cells."""
+        if self._spawn_obstacles_version != self.world.obstacle_version:
+            grid = SpatialHash()
+            for entity, collision, pos, sz in self.world.query(CollisionComponent, PositionComponent, SizeComponent):
+                if collision.layer != "obstacle":
+                    continue
+                tree = entity.components.get(TreeComponent)
+                if tree and tree.is_chopped:
+                    continue
+                grid.insert((pos.x, pos.y, sz.width, sz.height), entity)
+            self._spawn_obstacles = grid
+            self._spawn_obstacles_version = self.world.obstacle_version
+        return self._spawn_obstacles
+    
     def try_shoot(self, dt):
         current_time = self.game_time
         if current_time - self.last_fire_time < PROJECTILE_FIRE_RATE:
             return
         
-        direction_x = 0
-        direction_y = 0
-        
-        if self.arrow_keys_pressed[pyglet.window.key.UP]:
-            direction_y = 1
-        elif self.arrow_keys_pressed[pyglet.window.key.DOWN]:
-            direction_y = -1
-        
-        if self.arrow_keys_pressed[pyglet.window.key.LEFT]:
-            direction_x = -1
-        elif self.arrow_keys_pressed[pyglet.window.key.RIGHT]:
-            direction_x = 1
+        direction_x, direction_y = ARROW_DIRECTIONS[self.arrow_mask]
         
         if direction_x != 0 or direction_y != 0:
-            player_pos = self.player_entity.get_component(PositionComponent)
-            player_size = self.player_entity.get_component(SizeComponent)
+            player_pos = self.player_entity.position
+            player_size = self.player_entity.size
             player_comp = self.player_entity.get_component(PlayerComponent)
             
             player_center_x = player_pos.x + player_size.width / 2
@@ -2852,7 +3395,10 @@ class GameWindow(pyglet.window.Window):
             
             if time_remaining <= 5.0 and time_remaining > 0:
                 self.night_warning.visible = True
-                self.night_warning.text = f'NIGHT APPROACHES IN {int(time_remaining) + 1}...'
+                warning_secs = int(time_remaining) + 1
+                if warning_secs != self._last_warning_secs:
+                    self.night_warning.text = f'NIGHT APPROACHES IN {warning_secs}...'
+                    self._last_warning_secs = warning_secs
             else:
                 self.night_warning.visible = False
             
@@ -2861,14 +3407,17 @@ class GameWindow(pyglet.window.Window):
                 self.cycle_time = 0.0
                 self.night_warning.visible = False
                 self.night_warning.text = 'NIGHT HAS FALLEN!'
+                self._last_warning_secs = -1
                 self.night_warning.visible = True
                 self.night_warning_timer = 2.0
             
             mins = int(time_remaining // 60)
             secs = int(time_remaining % 60)
-            self.time_label.text = f'Day - {mins}:{secs:02d} until night'
-            self.time_label.color = (255, 255, 150, 255)
-            self.day_label.color = (255, 200, 50, 255)
+            if (False, mins, secs) != self._last_time_label:
+                self.time_label.text = f'Day - {mins}:{secs:02d} until night'
+                self.time_label.color = (255, 255, 150, 255)
+                self.day_label.color = (255, 200, 50, 255)
+                self._last_time_label = (False, mins, secs)
         else:
             time_remaining = NIGHT_LENGTH - self.cycle_time
             
@@ -2877,16 +3426,21 @@ class GameWindow(pyglet.window.Window):
                 self.cycle_time = 0.0
                 self.day_count += 1
                 self.night_warning.text = 'DAWN BREAKS!'
+                self._last_warning_secs = -1
                 self.night_warning.visible = True
                 self.night_warning_timer = 2.0
             
             mins = int(time_remaining // 60)
             secs = int(time_remaining % 60)
-            self.time_label.text = f'Night - {mins}:{secs:02d} until dawn'
-            self.time_label.color = (200, 100, 100, 255)
-            self.day_label.color = (150, 150, 200, 255)
+            if (True, mins, secs) != self._last_time_label:
+                self.time_label.text = f'Night - {mins}:{secs:02d} until dawn'
+                self.time_label.color = (200, 100, 100, 255)
+                self.day_label.color = (150, 150, 200, 255)
+                self._last_time_label = (True, mins, secs)
         
-        self.day_label.text = f'Day {self.day_count}'
+        if self.day_count != self._last_day_count:
+            self.day_label.text = f'Day {self.day_count}'
+            self._last_day_count = self.day_count
         
         if self.night_warning_timer > 0:
             self.night_warning_timer -= 1.0 / FPS
@@ -2904,8 +3458,8 @@ class GameWindow(pyglet.window.Window):
         self._update_lighting(dt)  # Update lighting smoothly
         
         # Update camera to follow player
-        player_pos = self.player_entity.get_component(PositionComponent)
-        player_size = self.player_entity.get_component(SizeComponent)
+        player_pos = self.player_entity.position
+        player_size = self.player_entity.size
         player_center_x = player_pos.x + player_size.width / 2
         player_center_y = player_pos.y + player_size.height / 2
         self.world.camera.update(player_center_x, player_center_y)
@@ -2924,7 +3478,7 @@ class GameWindow(pyglet.window.Window):
                     other_data = data.get('player', {})
                     other_player_comp = self.other_player_entity.get_component(PlayerComponent)
                     if other_data.get('id') == other_player_comp.player_id:
-                        other_pos = self.other_player_entity.get_component(PositionComponent)
+                        other_pos = self.other_player_entity.position
                         other_pos.x = other_data['x']
                         other_pos.y = other_data['y']
                 elif data.get('type') == 'projectile':
@@ -2939,6 +3493,9 @@ class GameWindow(pyglet.window.Window):
         
         # Update ECS world (runs all systems)
         self.world.update(dt)
+        # A system may have ended the game (and closed this window) mid-update
+        if not self.game_active:
+            return
         
         # Try to shoot
         self.try_shoot(dt)
@@ -2960,14 +3517,12 @@ class GameWindow(pyglet.window.Window):
             
             self.enemy_spawn_timer += dt
             if current_enemies < night_max_enemies and self.enemy_spawn_timer >= spawn_interval:
-                obstacles = self.world.get_entities_with(CollisionComponent, PositionComponent, SizeComponent)
-                obstacles = [e for e in obstacles if e.get_component(CollisionComponent).layer == "obstacle"]
-                enemy = spawn_enemy_ecs(self.world, player_center_x, player_center_y, obstacles)
+                enemy = spawn_enemy_ecs(self.world, player_center_x, player_center_y, self._get_spawn_obstacles())
                 self.enemy_spawn_timer = 0.0
                 
                 if self.is_multiplayer and self.network and self.network.connected:
                     enemy_comp = enemy.get_component(EnemyComponent)
-                    enemy_pos = enemy.get_component(PositionComponent)
+                    enemy_pos = enemy.position
                     self.network.send_data({
                         'type': 'enemy_spawn',
                         'x': enemy_pos.x, 'y': enemy_pos.y, 'id': enemy_comp.enemy_id
@@ -2984,26 +3539,23 @@ class GameWindow(pyglet.window.Window):
         time_since_last_shot = self.game_time - self.last_fire_time
         reload_progress = min(1.0, time_since_last_shot / PROJECTILE_FIRE_RATE)
         
-        screen_x, screen_y = self.world.camera.world_to_screen(player_center_x, player_center_y)
-        reload_x = screen_x + player_size.width // 2 + self.reload_circle_radius + 2
-        reload_y = screen_y + player_size.height // 2 + self.reload_circle_radius + 2
-        
-        self.reload_circle_bg.x = reload_x
-        self.reload_circle_bg.y = reload_y
+        player_sprite = self.player_entity.sprite.sprite
+        self.reload_group.x = player_sprite.x + player_size.width + self.reload_circle_radius + 2
+        self.reload_group.y = player_sprite.y + player_size.height + self.reload_circle_radius + 2
         
         if reload_progress >= 1.0:
             self.reload_circle_bg.visible = False
             self._clear_reload_arc()
         else:
             self.reload_circle_bg.visible = True
-            self._update_reload_arc(reload_x, reload_y, reload_progress)
+            self._update_reload_arc(reload_progress)
     
     def _clear_reload_arc(self):
         for segment in self.reload_arc_segments:
             segment.delete()
         self.reload_arc_segments.clear()
     
-    def _update_reload_arc(self, center_x, center_y, progress):
+    def _update_reload_arc(self, progress):
         self._clear_reload_arc()
         
         if progress <= 0:
@@ -3015,10 +3567,10 @@ class GameWindow(pyglet.window.Window):
         
         for i in range(num_segments):
             angle = start_angle + (angle_range * i / num_segments)
-            x = center_x + self.reload_circle_radius * math.cos(angle)
-            y = center_y + self.reload_circle_radius * math.sin(angle)
+            x = self.reload_circle_radius * math.cos(angle)
+            y = self.reload_circle_radius * math.sin(angle)
             
-            segment = shapes.Rectangle(x - 1, y - 1, 2, 2, color=(255, 255, 0), batch=self.batch)
+            segment = shapes.Rectangle(x - 1, y - 1, 2, 2, color=(255, 255, 0), batch=self.batch, group=self.reload_group)
             segment.opacity = 150
             self.reload_arc_segments.append(segment)
     
@@ -3033,30 +3585,45 @@ class GameWindow(pyglet.window.Window):
             else:
                 # Getting lighter near dawn
                 intensity = (night_progress - 0.5) * 0.1
-            self.target_bg_color = [intensity * 0.3, intensity * 0.3, intensity * 0.8, 1.0]
+            self.target_bg_color = (intensity * 0.3, intensity * 0.3, intensity * 0.8, 1.0)
         else:
             day_progress = self.cycle_time / DAY_LENGTH
             if day_progress < 0.15:
                 # Dawn - orange/yellow tint
                 intensity = 0.1 + (day_progress / 0.15) * 0.15
-                self.target_bg_color = [intensity * 0.8, intensity * 0.5, intensity * 0.2, 1.0]
+                self.target_bg_color = (intensity * 0.8, intensity * 0.5, intensity * 0.2, 1.0)
             elif day_progress > 0.85:
                 # Dusk - orange/red tint
                 dusk_progress = (day_progress - 0.85) / 0.15
                 intensity = 0.25 - (dusk_progress * 0.15)
-                self.target_bg_color = [intensity * 0.8, intensity * 0.4, intensity * 0.2, 1.0]
+                self.target_bg_color = (intensity * 0.8, intensity * 0.4, intensity * 0.2, 1.0)
             else:
                 # Midday
-                self.target_bg_color = [0.08, 0.08, 0.12, 1.0]
+                self.target_bg_color = (0.08, 0.08, 0.12, 1.0)
         
         # Smoothly interpolate current color towards target (lerp factor controls smoothness)
         lerp_factor = min(1.0, dt * 2.0)  # Adjust multiplier for transition speed (2.0 = ~0.5s transition)
-        for i in range(4):
-            self.current_bg_color[i] = self.current_bg_color[i] + (self.target_bg_color[i] - self.current_bg_color[i]) * lerp_factor
+        # All channels in one expression rather than an indexed loop; once
+        # within a hair of the target, settle on it so steady frames skip this
+        current = self.current_bg_color
+        target = self.target_bg_color
+        if current == target:
+            return
+        r, g, b, a = current
+        tr, tg, tb, ta = target
+        if max(abs(tr - r), abs(tg - g), abs(tb - b), abs(ta - a)) < 1e-4:
+            self.current_bg_color = target
+        else:
+            self.current_bg_color = (r + (tr - r) * lerp_factor, g + (tg - g) * lerp_factor,
+                                     b + (tb - b) * lerp_factor, a + (ta - a) * lerp_factor)
     
     def on_draw(self):
-        gl.glClearColor(*self.current_bg_color)
-        self.clear()
+        # The clear colour is context state, so only reissue it when it changes
+        if self.current_bg_color != self._clear_color:
+            self._clear_color = self.current_bg_color
+            gl.glClearColor(*self._clear_color)
+        # Nothing in the game draws with depth, so only the colour buffer needs clearing
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
         self.batch.draw()
     
     def show_game_over(self):
@@ -3072,7 +3639,9 @@ class GameWindow(pyglet.window.Window):
     def on_close(self):
         self.game_active = False
         pyglet.clock.unschedule(self.update)
-        self._clear_reload_arc()
+        pyglet.clock.unschedule(self.check_connection)
+        if self.reload_arc_segments:
+            self._clear_reload_arc()
         self.world.clear()
         if self.network:
             self.network.close()